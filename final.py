@@ -1,13 +1,14 @@
 from tkinter import *
 from tkinter import font
-from tkinter import messagebox
 from functools import partial
-from operator import attrgetter
-import webbrowser
 import numpy
-import random
+import heapq
 import math
-import os
+
+from maze.grid import Grid as SolverGrid
+from maze.anyangle import iter_cells, line_of_sight
+from maze.cache import SolveCache
+from maze.generate import GrowingTree
 
 
 class Maze:
@@ -63,138 +64,6 @@ class Maze:
             if tw:
                 tw.destroy()
 
-    class MyMaze(object):
-        """
-        Helper class that creates a random, perfect (without cycles) maze
-        """
-
-        def __init__(self, x_dimension, y_dimension):
-            self.dimensionX = x_dimension              # dimension of maze
-            self.dimensionY = y_dimension
-            self.gridDimensionX = x_dimension * 2 + 1  # dimension of output grid
-            self.gridDimensionY = y_dimension * 2 + 1
-            # output grid
-            self.mazeGrid = [[' ' for y in range(self.gridDimensionY)] for x in range(self.gridDimensionX)]
-            # 2d array of Cells
-            self.cells = [[self.Cell(x, y, False) for y in range(self.dimensionY)] for x in range(self.dimensionX)]
-            self.generate_maze()
-            self.update_grid()
-
-        class Cell(object):
-            """
-            inner class to represent a cell
-            """
-            def __init__(self, x, y, is_wall=True):
-                self.neighbors = []  # cells this cell is connected to
-                self.open = True     # if true, has yet to be used in generation
-                self.x = x           # coordinates
-                self.y = y
-                self.wall = is_wall  # impassable cell
-
-            def add_neighbor(self, other):
-                """
-                add a neighbor to this cell, and this cell as a neighbor to the other
-                """
-                if other not in self.neighbors:  # avoid duplicates
-                    self.neighbors.append(other)
-                if self not in other.neighbors:  # avoid duplicates
-                    other.neighbors.append(self)
-
-            def is_cell_below_neighbor(self):
-                """
-                used in update_grid()
-                """
-                return self.__class__(self.x, self.y + 1) in self.neighbors
-
-            def is_cell_right_neighbor(self):
-                """
-                used in update_grid()
-                """
-                return self.__class__(self.x + 1, self.y) in self.neighbors
-
-            def __eq__(self, other):
-                """
-                useful Cell equivalence
-                """
-                if isinstance(other, self.__class__):
-                    return self.x == other.x and self.y == other.y
-                else:
-                    return False
-
-        def generate_maze(self):
-            """
-            generate the maze from upper left (In computing the y increases down often)
-            """
-            start_at = self.get_cell(0, 0)
-            start_at.open = False  # indicate cell closed for generation
-            cells = [start_at]
-            while cells:
-                # this is to reduce but not completely eliminate the number
-                # of long twisting halls with short easy to detect branches
-                # which results in easy mazes
-                if random.randint(0, 9) == 0:
-                    cell = cells.pop(random.randint(0, cells.__len__()) - 1)
-                else:
-                    cell = cells.pop(cells.__len__() - 1)
-                # for collection
-                neighbors = []
-                # cells that could potentially be neighbors
-                potential_neighbors = [self.get_cell(cell.x + 1, cell.y), self.get_cell(cell.x, cell.y + 1),
-                                       self.get_cell(cell.x - 1, cell.y), self.get_cell(cell.x, cell.y - 1)]
-                for other in potential_neighbors:
-                    # skip if outside, is a wall or is not opened
-                    if other is None or other.wall or not other.open:
-                        continue
-                    neighbors.append(other)
-                if not neighbors:
-                    continue
-                # get random cell
-                selected = neighbors[random.randint(0, neighbors.__len__()) - 1]
-                # add as neighbor
-                selected.open = False  # indicate cell closed for generation
-                cell.add_neighbor(selected)
-                cells.append(cell)
-                cells.append(selected)
-
-        def get_cell(self, x, y):
-            """
-            used to get a Cell at x, y; returns None out of bounds
-            """
-            if x < 0 or y < 0:
-                return None
-            try:
-                return self.cells[x][y]
-            except IndexError:  # catch out of bounds
-                return None
-
-        def update_grid(self):
-            """
-            draw the maze
-            """
-            back_char = ' '
-            wall_char = 'X'
-            cell_char = ' '
-            # fill background
-            for x in range(self.gridDimensionX):
-                for y in range(self.gridDimensionY):
-                    self.mazeGrid[x][y] = back_char
-            # build walls
-            for x in range(self.gridDimensionX):
-                for y in range(self.gridDimensionY):
-                    if x % 2 == 0 or y % 2 == 0:
-                        self.mazeGrid[x][y] = wall_char
-            # make meaningful representation
-            for x in range(self.dimensionX):
-                for y in range(self.dimensionY):
-                    current = self.get_cell(x, y)
-                    grid_x = x * 2 + 1
-                    grid_y = y * 2 + 1
-                    self.mazeGrid[grid_x][grid_y] = cell_char
-                    if current.is_cell_below_neighbor():
-                        self.mazeGrid[grid_x][grid_y + 1] = cell_char
-                    if current.is_cell_right_neighbor():
-                        self.mazeGrid[grid_x + 1][grid_y] = cell_char
-
     class Cell(object):
         """
         Helper class that represents the cell of the grid
@@ -203,16 +72,6 @@ class Maze:
         def __init__(self, row, col):
             self.row = row  # the row number of the cell(row 0 is the top)
             self.col = col  # the column number of the cell (column 0 is the left)
-            self.g = 0      # the value of the function g of A* 
-            self.h = 0      # the value of the function h of A* 
-            self.f = 0      # the value of the function f of A* 
-            # the distance of the cell from the initial position of the robot
-            # Ie the label that updates the Dijkstra's algorithm
-            self.dist = 0
-            # Each state corresponds to a cell
-            # and each state has a predecessor which
-            # stored in this variable
-            self.prev = self.__class__
 
         def __eq__(self, other):
             """
@@ -223,12 +82,15 @@ class Maze:
             else:
                 return False
 
+        def __hash__(self):
+            return hash((self.row, self.col))
+
     #######################################
     #                                     #
     #      Constants of Maze42 class      #
     #                                     #
     #######################################
-    INFINITY = sys.maxsize  # The representation of the infinite
+    INFINITY = math.inf  # The representation of the infinite
     EMPTY = 0       # empty cell
     OBST = 1        # cell with obstacle
     ROBOT = 2       # the position of the robot
@@ -237,6 +99,10 @@ class Maze:
     CLOSED = 5      # cells that form the CLOSED SET
     ROUTE = 6       # cells that form the robot-to-target path
 
+    # the color of the cells of each value
+    COLORS = {EMPTY: "WHITE", OBST: "BLACK", ROBOT: "RED", TARGET: "GREEN",
+              FRONTIER: "BLUE", CLOSED: "CYAN", ROUTE: "YELLOW"}
+
     MSG_DRAW_AND_SELECT = "\"Paint\" obstacles, then click 'Real-Time' or 'Animation'"
     MSG_SELECT_STEP_BY_STEP_ETC = "Click 'Animation' or 'Clear'"
     MSG_NO_SOLUTION = "There is no path to the target !!!"
@@ -252,9 +118,12 @@ class Maze:
         self.square_size = int(500/self.rows)      # the cell size in pixels
         #self.arrow_size = int(self.square_size/2)  # the size of the tips of the arrow pointing the predecessor cell
 
-        self.openSet = []    # the OPEN SET
-        self.closedSet = []  # the CLOSED SET
-        self.graph = []      # the set of vertices of the graph to be explored by Dijkstra's algorithm
+        # the searches work on the node ids (row * columns + col) of the cells
+        self.openSet = []    # the OPEN SET, a heap of (f or dist, node)
+        self.closedSet = bytearray()  # the CLOSED SET, closedSet[node] is 1 once expanded
+        self.dist = []       # dist[node] is the distance from the robot (g of A*, dist of Dijkstra)
+        self.prev = []       # prev[node] is the predecessor of the node, -1 if none
+        self.touched = []    # the node ids of the cells painted by the last search
 
         self.robotStart = self.Cell(self.rows - 2, 1)    # the initial position of the robot
         self.targetPos = self.Cell(1, self.columns - 2)  # the position of the target
@@ -268,6 +137,8 @@ class Maze:
         self.delay = 50            # time delay of animation (in msec)
         self.expanded = 0           # the number of nodes that have been expanded
         self.selected_algo = "A*"  
+        self.solver_grid = None     # headless copy of the obstacles, used in Real-Time mode
+        self.solve_cache = SolveCache()  # results of the Real-Time searches
 
         self.array = numpy.array([0] * (83 * 83))
         self.cur_row = self.cur_col = self.cur_val = 0
@@ -310,7 +181,7 @@ class Maze:
         self.frame.place(x=515, y=300)
         self.radio_buttons = list()
 
-        for i, algorithm in enumerate(("A*","Dijkstra")):
+        for i, algorithm in enumerate(("A*","Dijkstra","Theta*")):
             btn = Radiobutton(self.frame, text=algorithm,  font=app_highlight_font, value=i + 1,
                               command=partial(self.select_algo, algorithm))
             btn.place(x=7 if i % 2 == 0 else 80, y=int(i/2)*25)
@@ -403,13 +274,11 @@ class Maze:
                 self.cur_col = col
                 self.cur_val = self.grid[row][col]
                 if self.cur_val == self.EMPTY:
-                    self.grid[row][col] = self.OBST
+                    self.set_obstacle(row, col, self.OBST)
                     self.paint_cell(row, col, "BLACK")
                 if self.cur_val == self.OBST:
-                    self.grid[row][col] = self.EMPTY
+                    self.set_obstacle(row, col, self.EMPTY)
                     self.paint_cell(row, col, "WHITE")
-                if self.realTime and self.selected_algo == "Dijkstra":
-                    self.initialize_dijkstra()
         if self.realTime:
             self.animation_action()
 
@@ -423,7 +292,7 @@ class Maze:
             if True if self.realTime else (not self.found and not self.searching):
                 if self.realTime:
                     self.fill_grid()
-                if self.Cell(row, col) != self.Cell(self.cur_row, self.cur_col) and\
+                if (row, col) != (self.cur_row, self.cur_col) and\
                         self.cur_val in [self.ROBOT, self.TARGET]:
                     new_val = self.grid[row][col]
                     if new_val == self.EMPTY:
@@ -446,13 +315,19 @@ class Maze:
                         self.cur_col = col
                         self.cur_val = self.grid[row][col]
                 elif self.grid[row][col] != self.ROBOT and self.grid[row][col] != self.TARGET:
-                    self.grid[row][col] = self.OBST
+                    self.set_obstacle(row, col, self.OBST)
                     self.paint_cell(row, col, "BLACK")
-                if self.realTime and self.selected_algo == "Dijkstra":
-                    self.initialize_dijkstra()
         if self.realTime:
             self.animation_action()
 
+    def set_obstacle(self, row, col, value):
+        """
+        Adds (value = OBST) or removes (value = EMPTY) an obstacle,
+        keeping the headless copy of the grid in sync
+        """
+        self.grid[row][col] = value
+        self.solver_grid.set(row, col, value)
+
     def initialize_grid(self, make_maze):
         """
         Creates a new clean grid or a new maze
@@ -474,20 +349,16 @@ class Maze:
         self.canvas.create_rectangle(0, 0, self.columns*self.square_size+1,
                                      self.rows*self.square_size+1, width=0, fill="DARK GREY")
 
-        for r in list(range(self.rows)):
-            for c in list(range(self.columns)):
-                self.grid[r][c] = self.EMPTY
+        self.grid[:] = self.EMPTY
         self.grid[self.rows-2][1] = self.ROBOT
         self.grid[1][self.columns-2] = self.TARGET
         self.robotStart = self.Cell(self.rows-2, 1)
         self.targetPos = self.Cell(1, self.columns-2)
         self.fill_grid()
         if make_maze:
-            maze = self.MyMaze(int(self.rows/2), int(self.columns/2))
-            for x in range(maze.gridDimensionX):
-                for y in range(maze.gridDimensionY):
-                    if maze.mazeGrid[x][y] == 'X':  # maze.wall_char:
-                        self.grid[x][y] = self.OBST
+            maze = GrowingTree(self.rows // 2, self.columns // 2).grid()
+            self.grid[maze == self.OBST] = self.OBST
+        self.solver_grid = SolverGrid(self.grid)
         self.repaint()
 
     def fill_grid(self):
@@ -496,61 +367,60 @@ class Maze:
         """
         # With the second click removes any obstacles also.
         if self.searching or self.endOfSearch:
-            for r in list(range(self.rows)):
-                for c in list(range(self.columns)):
-                    if self.grid[r][c] in [self.FRONTIER, self.CLOSED, self.ROUTE]:
-                        self.grid[r][c] = self.EMPTY
-                    if self.grid[r][c] == self.ROBOT:
-                        self.robotStart = self.Cell(r, c)
+            # only the cells painted by the last search have to be cleared
+            cleared = self.clear_touched()
             self.searching = False
         else:
-            for r in list(range(self.rows)):
-                for c in list(range(self.columns)):
-                    self.grid[r][c] = self.EMPTY
+            self.grid[:] = self.EMPTY
             self.robotStart = self.Cell(self.rows-2, 1)
             self.targetPos = self.Cell(1, self.columns-2)
-        if self.selected_algo in ["A*"]:
-            self.robotStart.g = 0
-            self.robotStart.h = 0
-            self.robotStart.f = 0
+            self.solver_grid = SolverGrid(self.grid)
+            cleared = None
         self.expanded = 0
         self.found = False
         self.searching = False
         self.endOfSearch = False
-
-        self.openSet.clear()
-        self.closedSet.clear()
-        self.openSet = [self.robotStart]
-        self.closedSet = []
+        self.initialize_search()
 
         self.grid[self.targetPos.row][self.targetPos.col] = self.TARGET
         self.grid[self.robotStart.row][self.robotStart.col] = self.ROBOT
         self.message.configure(text=self.MSG_DRAW_AND_SELECT)
 
-        self.repaint()
+        if cleared is None:
+            self.repaint()
+        else:
+            cleared.append(self.robotStart.row * self.columns + self.robotStart.col)
+            cleared.append(self.targetPos.row * self.columns + self.targetPos.col)
+            self.repaint_cells(cleared)
+
+    def clear_touched(self):
+        """
+        Turns the FRONTIER, CLOSED and ROUTE cells of the last search back to EMPTY;
+        the cost depends on the size of the search, not on the area of the grid
+
+        :return: the node ids of the cells cleared
+        """
+        touched = numpy.unique(numpy.array(self.touched, dtype=numpy.int64))
+        self.touched = []
+        cells = self.grid.reshape(-1)  # a view of the grid by node id
+        touched = touched[numpy.isin(cells[touched], (self.FRONTIER, self.CLOSED, self.ROUTE))]
+        cells[touched] = self.EMPTY
+        return touched.tolist()
 
     def repaint(self):
         """
         Repaints the grid
         """
-        color = ""
-        for r in list(range(self.rows)):
-            for c in list(range(self.columns)):
-                if self.grid[r][c] == self.EMPTY:
-                    color = "WHITE"
-                elif self.grid[r][c] == self.ROBOT:
-                    color = "RED"
-                elif self.grid[r][c] == self.TARGET:
-                    color = "GREEN"
-                elif self.grid[r][c] == self.OBST:
-                    color = "BLACK"
-                elif self.grid[r][c] == self.FRONTIER:
-                    color = "BLUE"
-                elif self.grid[r][c] == self.CLOSED:
-                    color = "CYAN"
-                elif self.grid[r][c] == self.ROUTE:
-                    color = "YELLOW"
-                self.paint_cell(r, c, color)
+        self.repaint_cells(range(self.rows * self.columns))
+
+    def repaint_cells(self, nodes):
+        """
+        Repaints the cells of the given node ids
+        """
+        cells = self.grid.reshape(-1)
+        for node in nodes:
+            row, col = divmod(node, self.columns)
+            self.paint_cell(row, col, self.COLORS[cells[node]])
 
     def paint_cell(self, row, col, color):
   
@@ -598,8 +468,6 @@ class Maze:
         
         for but in self.radio_buttons:
             but.configure(state="disabled")
-        if self.selected_algo == "Dijkstra":
-            self.initialize_dijkstra()
         self.animation = True
         self.delay = 0
         self.animation_action()
@@ -608,8 +476,8 @@ class Maze:
         """
         Action performed when user clicks "Animation" button
         """
-        if not self.searching and self.selected_algo == "Dijkstra":
-            self.initialize_dijkstra()
+        if not self.searching:
+            self.initialize_search()
         self.animation = True
         self.searching = True
         self.message.configure(text=self.MSG_SELECT_STEP_BY_STEP_ETC)
@@ -623,26 +491,63 @@ class Maze:
         """
         The action periodically performed during searching in animation mode
         """
+        if self.realTime:
+            self.real_time_search()
+            return
         if self.animation:
             self.check_termination()
             if self.endOfSearch:
                 return
             self.canvas.after(self.delay, self.animation_action) 
 
+    def real_time_search(self):
+        """
+        Solves the grid at once with the headless solver; dragging the robot or the
+        target back and forth mostly hits results already in the cache
+        """
+        start = self.solver_grid.node(self.robotStart.row, self.robotStart.col)
+        target = self.solver_grid.node(self.targetPos.row, self.targetPos.col)
+        result = self.solve_cache.solve(self.solver_grid, start, target, self.selected_algo)
+        self.endOfSearch = True
+        self.expanded = result.expanded
+        # paint the CLOSED and OPEN sets of the search at once
+        empty = self.grid == self.EMPTY
+        reached = numpy.frombuffer(result.prev, dtype=numpy.int64).reshape(self.rows, self.columns) >= 0
+        self.grid[empty & reached] = self.FRONTIER
+        if result.closed is not None:
+            closed = numpy.frombuffer(result.closed, dtype=numpy.uint8).reshape(self.rows, self.columns)
+            self.grid[empty & (closed != 0)] = self.CLOSED
+        self.touched.extend(numpy.flatnonzero(empty & reached).tolist())
+        self.slider.configure(state="disabled")
+        if not result.found:
+            self.message.configure(text=self.MSG_NO_SOLUTION)
+            self.repaint_cells(self.touched)
+            return
+        self.found = True
+        self.searching = False
+        route = list(result.iter_nodes())
+        self.grid.reshape(-1)[route] = self.ROUTE
+        self.touched.extend(route)
+        self.grid[self.robotStart.row][self.robotStart.col] = self.ROBOT
+        self.grid[self.targetPos.row][self.targetPos.col] = self.TARGET
+        self.repaint_cells(self.touched)
+        steps, distance = result.stats()
+        msg = "Nodes expanded: {0}, Steps: {1}, Distance: {2:.3f}".format(self.expanded, steps, distance)
+        self.message.configure(text=msg)
+
     def check_termination(self):
         """
         Checks if search is completed
         """
         # 2. If OPEN SET = [], then terminate. There is no solution.
-        if (self.selected_algo == "Dijkstra" and not self.graph) or\
-                self.selected_algo != "Dijkstra" and not self.openSet:
+        if not self.openSet:
             self.endOfSearch = True
             self.grid[self.robotStart.row][self.robotStart.col] = self.ROBOT
             self.message.configure(text=self.MSG_NO_SOLUTION)
             #self.buttons[4].configure(state="disabled")     # Step-by-Step button
             self.buttons[3].configure(state="disabled")     # Animation button
             self.slider.configure(state="disabled")
-            self.repaint()
+            self.paint_cell(self.robotStart.row, self.robotStart.col, "RED")
         else:
             self.expand_node()
             if self.found:
@@ -655,400 +560,108 @@ class Maze:
         """
         Expands a node and creates his successors
         """
-        # Dijkstra's algorithm to handle separately
-        if self.selected_algo == "Dijkstra":
-            # 11: while Q is not empty:
-            if not self.graph:
-                return
-            # 12:  u := vertex in Q (graph) with smallest distance in dist[] ;
-            # 13:  remove u from Q (graph);
-            u = self.graph.pop(0)
-            # Add vertex u in closed set
-            self.closedSet.append(u)
-            # If target has been found ...
-            if u == self.targetPos:
-                self.found = True
-                return
-            # Counts nodes that have expanded.
-            self.expanded += 1
-            # Update the color of the cell
-            self.grid[u.row][u.col] = self.CLOSED
-            # paint the cell
-            self.paint_cell(u.row, u.col, "CYAN")
-            # 14: if dist[u] = infinity:
-            if u.dist == self.INFINITY:
-                # ... then there is no solution.
-                # 15: break;
-                return
-                # 16: end if
-            # Create the neighbors of u
-            neighbors = self.create_successors(u, False)
-            # 18: for each neighbor v of u:
-            for v in neighbors:
-                # 20: alt := dist[u] + dist_between(u, v) ;
-                alt = u.dist + self.dist_between(u, v)
-                # 21: if alt < dist[v]:
-                if alt < v.dist:
-                    # 22: dist[v] := alt ;
-                    v.dist = alt
-                    # 23: previous[v] := u ;
-                    v.prev = u
-                    # Update the color of the cell
-                    self.grid[v.row][v.col] = self.FRONTIER
-                    # paint the cell
-                    self.paint_cell(v.row, v.col, "BLUE")
-                    # 24: decrease-key v in Q;
-                    # (sort list of nodes with respect to dist)
-                    self.graph.sort(key=attrgetter("dist"))
-        # The handling of the other four algorithms
-        else:
-            if 1:
-                # Here is the 3rd step of the algorithms A*
-                self.openSet.sort(key=attrgetter("f"))
-                current = self.openSet.pop(0)
-            # ... and add it to CLOSED SET.
-            self.closedSet.insert(0, current)
-            # Update the color of the cell
-            self.grid[current.row][current.col] = self.CLOSED
-            # paint the cell
-            self.paint_cell(current.row, current.col, "CYAN")
-            # If the selected node is the target ...
-            if current == self.targetPos:
-                # ... then terminate etc
-                last = self.targetPos
-                last.prev = current.prev
-                self.closedSet.append(last)
-                self.found = True
-                return
-            # Count nodes that have been expanded.
-            self.expanded += 1
-            successors = self.create_successors(current, False)
-            # Here is the 5th step of the algorithms
-            # 5. For each successor of Si, ...
-            for cell in successors:
-                if 0:
-                    # ... add the successor at the beginning of the list OPEN SET
-                    self.openSet.insert(0, cell)
-                    # Update the color of the cell
-                    self.grid[cell.row][cell.col] = self.FRONTIER
-                    # paint the cell
-                    self.paint_cell(cell.row, cell.col, "BLUE")
-                elif 0:
-                    # ... add the successor at the end of the list OPEN SET
-                    self.openSet.append(cell)
-                    # Update the color of the cell
-                    self.grid[cell.row][cell.col] = self.FRONTIER
-                    # paint the cell
-                    self.paint_cell(cell.row, cell.col, "BLUE")
-                # ... if we are running A* algorithms (step 5 of A* algorithm) ...
-                elif self.selected_algo in ["A*"]:
-                    # ... calculate the value f(Sj) ...
-                    dxg = current.col - cell.col
-                    dyg = current.row - cell.row
-                    dxh = self.targetPos.col - cell.col
-                    dyh = self.targetPos.row - cell.row
-                    if 1:
-                        # with diagonal movements, the Euclidean distance
-                        
-                        cell.g = current.g + math.sqrt(dxg*dxg + dyg*dyg)
-                        cell.h = math.sqrt(dxh*dxh + dyh*dyh)
-                    else:
-                        
-                        cell.g = current.g + abs(dxg) + abs(dyg)
-                        cell.h = abs(dxh) + abs(dyh)
-                    cell.f = cell.g+cell.h
-                    
-                    if cell not in self.openSet and cell not in self.closedSet:
-                        # ... then add Sj in the OPEN SET ...
-                        # ... evaluated as f(Sj)
-                        self.openSet.append(cell)
-                        # Update the color of the cell
-                        self.grid[cell.row][cell.col] = self.FRONTIER
-                        # paint the cell
-                        self.paint_cell(cell.row, cell.col, "BLUE")
-                    # Else ...
-                    else:
-                        # ... if already belongs to the OPEN SET, then ...
-                        if cell in self.openSet:
-                            open_index = self.openSet.index(cell)
-                            # ... compare the new value assessment with the old one.
-                            # If old <= new ...
-                            if self.openSet[open_index].f <= cell.f:
-                                # ... then eject the new node with state Sj.
-                                # (ie do nothing for this node).
-                                pass
-                            # Else, ...
-                            else:
-                                # ... remove the element (Sj, old) from the list
-                                # to which it belongs ...
-                                self.openSet.pop(open_index)
-                                # ... and add the item (Sj, new) to the OPEN SET.
-                                self.openSet.append(cell)
-                                # Update the color of the cell
-                                self.grid[cell.row][cell.col] = self.FRONTIER
-                                # paint the cell
-                                self.paint_cell(cell.row, cell.col, "BLUE")
-                        # ... if already belongs to the CLOSED SET, then ...
-                        elif cell in self.closedSet:
-                            closed_index = self.closedSet.index(cell)
-                            # ... compare the new value assessment with the old one.
-                            # If old <= new ...
-                            if self.closedSet[closed_index].f <= cell.f:
-                                # ... then eject the new node with state Sj.
-                                # (ie do nothing for this node).
-                                pass
-                            # Else, ...
-                            else:
-                                # ... remove the element (Sj, old) from the list
-                                # to which it belongs ...
-                                self.closedSet.pop(closed_index)
-                                # ... and add the item (Sj, new) to the OPEN SET.
-                                self.openSet.append(cell)
-                                # Update the color of the cell
-                                self.grid[cell.row][cell.col] = self.FRONTIER
-                                # paint the cell
-                                self.paint_cell(cell.row, cell.col, "BLUE")
-
-    def create_successors(self, current, make_connected):
-        """
-        Creates the successors of a state/cell
-        """
-        r = current.row
-        c = current.col
-        # We create an empty list for the successors of the current cell.
-        temp = []
-
-        if r > 0 and self.grid[r-1][c] != self.OBST and\
-                (self.selected_algo in ["A*","Dijkstra"] 
-                and not self.Cell(r-1, c) in self.openSet and not self.Cell(r-1, c) in self.closedSet):
-            cell = self.Cell(r-1, c)
-            if self.selected_algo == "Dijkstra":
-                if make_connected:
-                    temp.append(cell)
-                elif cell in self.graph:
-                    graph_index = self.graph.index(cell)
-                    temp.append(self.graph[graph_index])
-            else:
-                # ... update the pointer of the up-side cell so it points the current one ...
-                cell.prev = current
-                # ... and add the up-side cell to the successors of the current one.
-                temp.append(cell)
-
-        if 1:
-
-            if r > 0 and c < self.columns-1 and self.grid[r-1][c+1] != self.OBST and \
-                    (self.grid[r-1][c] != self.OBST or self.grid[r][c+1] != self.OBST) and \
-                    (self.selected_algo in ["A*", "Dijkstra"] or
-                     (0
-                     and not self.Cell(r-1, c+1) in self.openSet and not self.Cell(r-1, c+1) in self.closedSet)):
-                cell = self.Cell(r-1, c+1)
-                if self.selected_algo == "Dijkstra":
-                    if make_connected:
-                        temp.append(cell)
-                    elif cell in self.graph:
-                        graph_index = self.graph.index(cell)
-                        temp.append(self.graph[graph_index])
-                else:
-                    # ... update the pointer of the up-right-side cell so it points the current one ...
-                    cell.prev = current
-                    # ... and add the up-right-side cell to the successors of the current one.
-                    temp.append(cell)
-        # and (only in the case are not running the A* )
-        # not already belongs neither to the OPEN SET nor to the CLOSED SET ...
-        if c < self.columns-1 and self.grid[r][c+1] != self.OBST and\
-                (self.selected_algo in ["A*", "Dijkstra"] or
-                 (0
-                 and not self.Cell(r, c+1) in self.openSet and not self.Cell(r, c+1) in self.closedSet)):
-            cell = self.Cell(r, c+1)
-            if self.selected_algo == "Dijkstra":
-                if make_connected:
-                    temp.append(cell)
-                elif cell in self.graph:
-                    graph_index = self.graph.index(cell)
-                    temp.append(self.graph[graph_index])
-            else:
-                # ... update the pointer of the right-side cell so it points the current one ...
-                cell.prev = current
-                # ... and add the right-side cell to the successors of the current one.
-                temp.append(cell)
-
-        if 1:
-            # If we are not even at the lowermost nor at the rightmost border of the grid
-            # and the down-right-side cell is not an obstacle
-            # and one of the down-side or right-side cells are not obstacles
-            # and (only in the case are not running the A*)
-            # not already belongs neither to the OPEN SET nor to the CLOSED SET ...
-            if r < self.rows-1 and c < self.columns-1 and self.grid[r+1][c+1] != self.OBST and \
-                    (self.grid[r+1][c] != self.OBST or self.grid[r][c+1] != self.OBST) and \
-                    (self.selected_algo in ["A*", "Dijkstra"] or
-                     (0
-                     and not self.Cell(r+1, c+1) in self.openSet and not self.Cell(r+1, c+1) in self.closedSet)):
-                cell = self.Cell(r+1, c+1)
-                if self.selected_algo == "Dijkstra":
-                    if make_connected:
-                        temp.append(cell)
-                    elif cell in self.graph:
-                        graph_index = self.graph.index(cell)
-                        temp.append(self.graph[graph_index])
-                else:
-                    # ... update the pointer of the downr-right-side cell so it points the current one ...
-                    cell.prev = current
-                    # ... and add the down-right-side cell to the successors of the current one.
-                    temp.append(cell)
-
-        # not already belongs neither to the OPEN SET nor to the CLOSED SET ...
-        if r < self.rows-1 and self.grid[r+1][c] != self.OBST and \
-                (self.selected_algo in ["A*", "Dijkstra"] or
-                 (0
-                 and not self.Cell(r+1, c) in self.openSet and not self.Cell(r+1, c) in self.closedSet)):
-            cell = self.Cell(r+1, c)
-            if self.selected_algo == "Dijkstra":
-                if make_connected:
-                    temp.append(cell)
-                elif cell in self.graph:
-                    graph_index = self.graph.index(cell)
-                    temp.append(self.graph[graph_index])
-            else:
-                # ... update the pointer of the down-side cell so it points the current one ...
-                cell.prev = current
-                # ... and add the down-side cell to the successors of the current one.
-                temp.append(cell)
-
-        if 1:
-
-            # not already belongs neither to the OPEN SET nor to the CLOSED SET ...
-            if r < self.rows-1 and c > 0 and self.grid[r+1][c-1] != self.OBST and \
-                    (self.grid[r+1][c] != self.OBST or self.grid[r][c-1] != self.OBST) and \
-                    (self.selected_algo in ["A*", "Dijkstra"] or
-                     (0
-                     and not self.Cell(r+1, c-1) in self.openSet and not self.Cell(r+1, c-1) in self.closedSet)):
-                cell = self.Cell(r+1, c-1)
-                if self.selected_algo == "Dijkstra":
-                    if make_connected:
-                        temp.append(cell)
-                    elif cell in self.graph:
-                        graph_index = self.graph.index(cell)
-                        temp.append(self.graph[graph_index])
-                else:
-                    # ... update the pointer of the down-left-side cell so it points the current one ...
-                    cell.prev = current
-                    # ... and add the down-left-side cell to the successors of the current one.
-                    temp.append(cell)
-        if c > 0 and self.grid[r][c-1] != self.OBST and \
-                (self.selected_algo in ["A*", "Dijkstra"] or
-                 (0
-                 and not self.Cell(r, c-1) in self.openSet and not self.Cell(r, c-1) in self.closedSet)):
-            cell = self.Cell(r, c-1)
-            if self.selected_algo == "Dijkstra":
-                if make_connected:
-                    temp.append(cell)
-                elif cell in self.graph:
-                    graph_index = self.graph.index(cell)
-                    temp.append(self.graph[graph_index])
-            else:
-                # ... update the pointer of the left-side cell so it points the current one ...
-                cell.prev = current
-                # ... and add the left-side cell to the successors of the current one.
-                temp.append(cell)
-
-        if 1:
-            if r > 0 and c > 0 and self.grid[r-1][c-1] != self.OBST and \
-                    (self.grid[r-1][c] != self.OBST or self.grid[r][c-1] != self.OBST) and \
-                    (self.selected_algo in ["A*","Dijkstra"] or
-                     (0
-                     and not self.Cell(r-1, c-1) in self.openSet and not self.Cell(r-1, c-1) in self.closedSet)):
-                cell = self.Cell(r-1, c-1)
-                if self.selected_algo == "Dijkstra":
-                    if make_connected:
-                        temp.append(cell)
-                    elif cell in self.graph:
-                        graph_index = self.graph.index(cell)
-                        temp.append(self.graph[graph_index])
+        closed = self.closedSet
+        # 3. Remove from OPEN SET the node with the lowest f (A*) or dist (Dijkstra),
+        # skipping the entries left behind by a shorter path found since
+        while self.openSet and closed[self.openSet[0][1]]:
+            heapq.heappop(self.openSet)
+        if not self.openSet:
+            return
+        u = heapq.heappop(self.openSet)[1]
+        # ... and add it to CLOSED SET.
+        closed[u] = 1
+        # If the selected node is the target ...
+        target = self.solver_grid.node(self.targetPos.row, self.targetPos.col)
+        if u == target:
+            # ... then terminate etc
+            self.found = True
+            return
+        # Count nodes that have been expanded.
+        self.expanded += 1
+        row, col = divmod(u, self.columns)
+        # Update the color of the cell
+        self.grid[row][col] = self.CLOSED
+        self.touched.append(u)
+        # paint the cell
+        self.paint_cell(row, col, "CYAN")
+        p = self.prev[u]
+        # 5. For each successor v of u, ...
+        for v, step in self.create_successors(u):
+            if closed[v]:
+                continue
+            # ... alt := dist[u] + dist_between(u, v) ...
+            alt = self.dist[u] + step
+            parent = u
+            # ... or, with Theta*, the straight segment from the predecessor of u if in sight
+            if self.selected_algo == "Theta*" and p >= 0 and line_of_sight(self.solver_grid, p, v):
+                alt = self.dist[p] + self.solver_grid.dist_between(p, v)
+                parent = p
+            # ... if alt < dist[v], v is reached by a shorter path
+            if alt < self.dist[v]:
+                self.dist[v] = alt
+                self.prev[v] = parent
+                row, col = divmod(v, self.columns)
+                if self.selected_algo != "Dijkstra":
+                    # f(v) = g(v) + h(v), with diagonal movements the Euclidean distance
+                    key = alt + math.hypot(self.targetPos.row - row, self.targetPos.col - col)
                 else:
-                    # ... update the pointer of the up-left-side cell so it points the current one ...
-                    cell.prev = current
-                    # ... and add the up-left-side cell to the successors of the current one.
-                    temp.append(cell)
+                    key = alt
+                # (Sj, new) replaces (Sj, old) in the OPEN SET
+                heapq.heappush(self.openSet, (key, v))
+                # Update the color of the cell
+                self.grid[row][col] = self.FRONTIER
+                self.touched.append(v)
+                # paint the cell
+                self.paint_cell(row, col, "BLUE")
 
-        if self.selected_algo!=0:
-            return temp
+    def create_successors(self, u):
+        """
+        Creates the successors of a node, as (node, step cost) pairs: the free
+        neighbours, up to up-left clockwise, with the diagonal moves allowed
+        only if one of the two cells they pass by is free
+        """
+        return self.solver_grid.successors(u)
 
     def plot_route(self):
         """
-        Calculates the path from the target to the initial position of the robot,
-        counts the corresponding steps and measures the distance traveled.
+        Calculates the path from the target to the initial position of the robot,
+        counts the corresponding steps and measures the distance traveled.
         """
-        self.repaint()
         self.searching = False
         steps = 0
         distance = 0.0
-        index = self.closedSet.index(self.targetPos)
-        cur = self.closedSet[index]
-        self.grid[cur.row][cur.col] = self.TARGET
-        self.paint_cell(cur.row, cur.col, "GREEN")
-        while cur != self.robotStart:
-            steps += 1
-            if 1:
-                dx = cur.col - cur.prev.col
-                dy = cur.row - cur.prev.row
-                distance += math.sqrt(dx*dx + dy*dy)
-            else:
-                distance += 1
-            cur = cur.prev
-            self.grid[cur.row][cur.col] = self.ROUTE
-            self.paint_cell(cur.row, cur.col, "YELLOW")
+        start = self.solver_grid.node(self.robotStart.row, self.robotStart.col)
+        cur = self.solver_grid.node(self.targetPos.row, self.targetPos.col)
+        self.grid[self.targetPos.row][self.targetPos.col] = self.TARGET
+        self.paint_cell(self.targetPos.row, self.targetPos.col, "GREEN")
+        while cur != start:
+            distance += self.solver_grid.dist_between(cur, self.prev[cur])
+            # the cells up to the predecessor, more than one after a Theta* segment
+            for node in list(iter_cells((cur, self.prev[cur]), self.columns))[1:]:
+                steps += 1
+                row, col = divmod(node, self.columns)
+                self.grid[row][col] = self.ROUTE
+                self.touched.append(node)
+                self.paint_cell(row, col, "YELLOW")
+            cur = self.prev[cur]
 
         self.grid[self.robotStart.row][self.robotStart.col] = self.ROBOT
         self.paint_cell(self.robotStart.row, self.robotStart.col, "RED")
         msg = "Nodes expanded: {0}, Steps: {1}, Distance: {2:.3f}".format(self.expanded, steps, distance)
         self.message.configure(text=msg)
 
-    def dist_between(self, u, v):
-
-        dx = u.col - v.col
-        dy = u.row - v.row
-        if 1:
-            # with diagonal movements calculate the Euclidean distance
-            return math.sqrt(dx*dx + dy*dy)
-        else:
-            # without diagonal movements calculate Manhattan distance
-            return abs(dx) + abs(dy)
-
-    def find_connected_component(self, v):
-        """
-        Appends to the list containing the nodes of the graph only
-        the cells belonging to the same connected component with node v.
-
-        :param v: the starting node
-        """
-        stack = [v]
-        self.graph.append(v)
-        while stack:
-            v = stack.pop()
-            successors = self.create_successors(v, True)
-            for c in successors:
-                if c not in self.graph:
-                    stack.append(c)
-                    self.graph.append(c)
-
-    def initialize_dijkstra(self):
+    def initialize_search(self):
         """
-        Initialization of Dijkstra's algorithm
+        Initialization of the animated searches: only the robot is in the OPEN SET
         """
-        self.graph.clear()
-        self.find_connected_component(self.robotStart)
-        # Here is the initialization of Dijkstra's algorithm
-        # 2: for each vertex v in Graph;
-        for v in self.graph:
-            # 3: dist[v] := infinity ;
-            v.dist = self.INFINITY
-            # 5: previous[v] := undefined ;
-            v.prev = None
-        # 8: dist[source] := 0;
-        self.graph[self.graph.index(self.robotStart)].dist = 0
-        self.graph.sort(key=attrgetter("dist"))
-        # Initializes the list of closed nodes
-        self.closedSet.clear()
+        start = self.solver_grid.node(self.robotStart.row, self.robotStart.col)
+        # 2: for each vertex v in Graph: dist[v] := infinity, previous[v] := undefined
+        self.dist = self.solver_grid.new_table('d', self.INFINITY)
+        self.prev = self.solver_grid.new_table('q', -1)
+        self.closedSet = self.solver_grid.new_table('B', 0)
+        # 8: dist[source] := 0
+        self.dist[start] = 0.0
+        self.openSet = [(0.0, start)]
 
     @staticmethod
     def center(window):
@@ -0,0 +1,46 @@
+"""
+Headless core of the maze solver: the grid, the search algorithms and the routes.
+
+The names below are imported from their submodules on first use, so that
+importing the package (e.g. for python -m maze) does not load numpy or the
+solvers before they are needed.
+"""
+import importlib
+
+_EXPORTS = {
+    "Grid": "maze.grid",
+    "EMPTY": "maze.grid",
+    "OBST": "maze.grid",
+    "ROBOT": "maze.grid",
+    "TARGET": "maze.grid",
+    "FRONTIER": "maze.grid",
+    "CLOSED": "maze.grid",
+    "ROUTE": "maze.grid",
+    "SearchResult": "maze.solver",
+    "ShortestPathTree": "maze.solver",
+    "ALGORITHMS": "maze.solver",
+    "astar": "maze.solver",
+    "dijkstra": "maze.solver",
+    "solve": "maze.solver",
+    "theta_star": "maze.solver",
+    "lazy_theta_star": "maze.solver",
+    "frontier_astar": "maze.solver",
+    "NodeLimitExceeded": "maze.solver",
+    "line_of_sight": "maze.anyangle",
+    "nearest_target": "maze.multi",
+    "multi_source_dijkstra": "maze.multi",
+    "TiledGrid": "maze.tiled",
+    "open_grid": "maze.tiled",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError("module 'maze' has no attribute {0!r}".format(name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
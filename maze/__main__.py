@@ -0,0 +1,5 @@
+import sys
+
+from maze.cli import main
+
+sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Geometry of the any-angle routes: line of sight and path smoothing.
+
+An any-angle route is a list of waypoints joined by straight segments instead of
+a chain of adjacent cells. A segment is allowed when the cells of its Bresenham
+line are all free and every diagonal step of the line obeys the corner rule of
+the grid moves (one of the two cells it passes by is free), so that walking the
+cells of the segments is always a legal route on the grid.
+
+Long lines are computed with whole-array numpy operations on grid.cells, one
+call per segment; short ones, the bulk of the checks of a search, are walked on
+the passability table, where they are cheaper than the overhead of numpy.
+"""
+import math
+
+import numpy
+
+from maze.grid import OBST
+
+SHORT_LINE = 64  # the longest lines, in steps, checked without numpy
+
+
+def line_cells(u, v, columns):
+    """
+    Returns the (rows, cols) arrays of the cells of the Bresenham line between
+    two nodes, from the lower node id to the higher one so that the line from u
+    to v and the line from v to u are the same
+    """
+    if u > v:
+        u, v = v, u
+    r0, c0 = divmod(u, columns)
+    r1, c1 = divmod(v, columns)
+    n = max(abs(r1 - r0), abs(c1 - c0))
+    if n == 0:
+        return numpy.array([r0]), numpy.array([c0])
+    t = numpy.arange(n + 1)
+    # round(d * t / n) in integers, halves rounded up
+    rows = r0 + (2 * (r1 - r0) * t + n) // (2 * n)
+    cols = c0 + (2 * (c1 - c0) * t + n) // (2 * n)
+    return rows, cols
+
+
+def line_of_sight(grid, u, v):
+    """
+    Returns True if the straight segment between two nodes is a legal move
+    """
+    columns = grid.columns
+    if u > v:
+        u, v = v, u
+    r0, c0 = divmod(u, columns)
+    r1, c1 = divmod(v, columns)
+    dr = r1 - r0
+    dc = c1 - c0
+    n = max(abs(dr), abs(dc))
+    if n <= SHORT_LINE:
+        free = grid.free
+        if not free[u]:
+            return False
+        last_r, last_c = r0, c0
+        for t in range(1, n + 1):
+            r = r0 + (2 * dr * t + n) // (2 * n)
+            c = c0 + (2 * dc * t + n) // (2 * n)
+            if not free[r * columns + c]:
+                return False
+            if r != last_r and c != last_c and not free[last_r * columns + c] and not free[r * columns + last_c]:
+                return False
+            last_r, last_c = r, c
+        return True
+    t = numpy.arange(n + 1)
+    rows = r0 + (2 * dr * t + n) // (2 * n)
+    cols = c0 + (2 * dc * t + n) // (2 * n)
+    flat = rows * columns + cols
+    cells = grid.cells.reshape(-1)
+    if (cells[flat] == OBST).any():
+        return False
+    # a diagonal step needs one of the two cells it passes by to be free
+    shift = cols[1:] - cols[:-1]
+    diagonal = (rows[1:] != rows[:-1]) & (shift != 0)
+    if diagonal.any():
+        shift = shift[diagonal]
+        if ((cells[flat[:-1][diagonal] + shift] == OBST) & (cells[flat[1:][diagonal] - shift] == OBST)).any():
+            return False
+    return True
+
+
+def iter_cells(waypoints, columns):
+    """
+    Yields the node ids of the cells visited along the segments between waypoints
+    """
+    last = None
+    for node in waypoints:
+        if last is None:
+            yield node
+        elif node != last:
+            rows, cols = line_cells(last, node, columns)
+            line = (rows * columns + cols).tolist()
+            if line[0] != last:
+                line.reverse()
+            yield from line[1:]
+        last = node
+
+
+def path_length(waypoints, columns):
+    """
+    Returns the Euclidean length of the segments between waypoints
+    """
+    length = 0.0
+    last = None
+    for node in waypoints:
+        if last is not None:
+            ur, uc = divmod(last, columns)
+            vr, vc = divmod(node, columns)
+            length += math.hypot(ur - vr, uc - vc)
+        last = node
+    return length
+
+
+def smooth(grid, nodes):
+    """
+    Shortens a route by string pulling: every waypoint is joined to the farthest
+    later node of the route still in line of sight
+
+    :param nodes: the node ids of a legal route, e.g. of a grid search
+    :return:      the list of the waypoints kept
+    """
+    nodes = list(nodes)
+    if len(nodes) < 3:
+        return nodes
+    waypoints = [nodes[0]]
+    anchor = nodes[0]
+    last = nodes[1]
+    for node in nodes[2:]:
+        if not line_of_sight(grid, anchor, node):
+            waypoints.append(last)
+            anchor = last
+        last = node
+    waypoints.append(last)
+    return waypoints
@@ -0,0 +1,124 @@
+"""
+Benchmarks of the headless solver: cold start, maze generation throughput,
+latency of the solve service and memory of the searches.
+"""
+import math
+import subprocess
+import sys
+import time
+
+STARTUP_IMPORTS = "import maze.cli, maze.io, maze.solver"
+
+
+def measure_startup(runs, imports=STARTUP_IMPORTS):
+    """
+    Returns the times, in seconds, of cold starts of a fresh interpreter
+    importing the solver core
+    """
+    times = []
+    for _ in range(runs):
+        begin = time.perf_counter()
+        subprocess.run([sys.executable, "-c", imports], check=True)
+        times.append(time.perf_counter() - begin)
+    return times
+
+
+def generator_throughput(name, height, width, repeat=3, seed=0):
+    """
+    Returns the best throughput, in maze cells per second, of a maze generator
+
+    :param name: one of the names in maze.generate.GENERATORS
+    """
+    from maze.generate import generator
+
+    best = None
+    for i in range(repeat):
+        maker = generator(name, height, width, seed + i)
+        begin = time.perf_counter()
+        for _ in maker.iter_rows():
+            pass
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return height * width / best if best else float("inf")
+
+
+def search_memory(grid, start, target, algorithm="A*", **options):
+    """
+    Measures a search twice: its peak memory under tracemalloc, then its time
+    without tracing
+
+    :param options: passed to maze.solver.solve(), e.g. max_nodes
+    :return:        (seconds, peak bytes allocated, SearchResult)
+    """
+    import tracemalloc
+    from maze.solver import solve
+
+    tracemalloc.start()
+    try:
+        solve(grid, start, target, algorithm, **options)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    begin = time.perf_counter()
+    result = solve(grid, start, target, algorithm, **options)
+    return time.perf_counter() - begin, peak, result
+
+
+def random_queries(grid, name, count, algorithm="A*", seed=0):
+    """
+    Returns count solve requests between random free cells of a grid, for the load generator
+    """
+    import random
+
+    rnd = random.Random(seed)
+    free = [node for node in range(len(grid)) if grid.free[node]]
+    queries = []
+    for _ in range(count):
+        start, target = rnd.choice(free), rnd.choice(free)
+        queries.append({"maze": name, "start": list(grid.coords(start)),
+                        "target": list(grid.coords(target)), "algorithm": algorithm})
+    return queries
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of values (nearest rank)
+    """
+    ordered = sorted(values)
+    rank = max(int(math.ceil(p / 100.0 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+async def load(queries, concurrency, host=None, port=None, path=None):
+    """
+    Sends the requests to a solve service from concurrency clients, each one
+    waiting for an answer before sending its next request
+
+    :return: (latencies in seconds, responses)
+    """
+    import asyncio
+    import json
+
+    from maze.service import HOST, PORT
+
+    latencies = []
+    responses = []
+    todo = iter(enumerate(queries))
+
+    async def client():
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host or HOST, port or PORT)
+        for i, query in todo:
+            begin = time.perf_counter()
+            writer.write(json.dumps(dict(query, id=i)).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            latencies.append(time.perf_counter() - begin)
+            responses.append(json.loads(line))
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, responses
@@ -0,0 +1,201 @@
+"""
+Cache of search results keyed by the content of the grid.
+
+The content of a grid is identified by a Zobrist fingerprint: every cell has a
+pseudo-random 64 bit key and the fingerprint is the XOR of the keys of the
+obstacles. The keys are not stored but derived from the node ids with the
+splitmix64 mix. The fingerprint is computed once per grid, scanning the cells a
+band of rows at a time, and then kept up to date by a watcher of Grid.set(),
+one XOR per painted cell, so it never needs a full rehash.
+"""
+import hashlib
+import sys
+from collections import OrderedDict
+
+import numpy
+
+from maze.grid import OBST
+from maze.solver import ShortestPathTree, solve
+
+CACHE_SIZE = 256  # the default maximum number of cached results
+TREES = 8         # the default maximum number of kept shortest-path trees
+BAND = 1 << 20    # the number of cells scanned at a time by Fingerprint()
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9E3779B97F4A7C15
+
+
+def mix(node, seed):
+    """
+    Returns the 64 bit key of a node: the splitmix64 output for state seed + (node + 1) * GOLDEN
+    """
+    z = (seed + (node + 1) * GOLDEN) & MASK
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK
+    return z ^ (z >> 31)
+
+
+def mix_array(nodes, seed):
+    """
+    Vectorized mix() of a numpy array of node ids, wrapping modulo 2**64
+    """
+    z = numpy.uint64(seed) + (nodes.astype(numpy.uint64) + numpy.uint64(1)) * numpy.uint64(GOLDEN)
+    z = (z ^ (z >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+    return z ^ (z >> numpy.uint64(31))
+
+
+class Fingerprint(object):
+    """
+    Incrementally maintained fingerprint of the obstacles of a grid
+    """
+
+    def __init__(self, grid, seed=0x5EED):
+        self.grid = grid
+        self.seed = seed
+        self.value = 0
+        band = max(1, BAND // max(1, grid.columns))
+        for row in range(0, grid.rows, band):
+            obstacles = numpy.flatnonzero(numpy.asarray(grid.cells[row:row + band]) == OBST)
+            if len(obstacles):
+                obstacles += row * grid.columns
+                self.value ^= int(numpy.bitwise_xor.reduce(mix_array(obstacles, seed)))
+        self._costs = None
+        self._costs_hash = None
+        grid.watchers.append(self._cell_changed)
+
+    def _cell_changed(self, node, old, new):
+        if (old == OBST) != (new == OBST):
+            self.value ^= mix(node, self.seed)
+
+    def key(self):
+        """
+        Returns a hashable key identifying the current content of the grid
+        """
+        costs = self.grid.costs
+        if costs is not self._costs:
+            # the cost plane is hashed once each time it is replaced
+            self._costs = costs
+            self._costs_hash = None if costs is None else \
+                hashlib.blake2b(numpy.ascontiguousarray(costs).tobytes(), digest_size=16).digest()
+        return self.grid.rows, self.grid.columns, self.value, self._costs_hash
+
+
+def fingerprint(grid):
+    """
+    Returns the Fingerprint of a grid, attaching one on first use
+    """
+    try:
+        return grid.fingerprint
+    except AttributeError:
+        grid.fingerprint = Fingerprint(grid)
+        return grid.fingerprint
+
+
+class SolveCache(object):
+    """
+    LRU cache of SearchResults keyed by (grid content, start, target, algorithm).
+
+    Dijkstra queries are answered from ShortestPathTrees keyed by (grid content,
+    start) instead, so that moving only the target reuses the settled tree.
+
+    A result or a tree keeps the Grid it was computed on, and may be found
+    again from another Grid with the same content. It is dropped if its own
+    Grid has been painted since, as it no longer matches its key.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, maxbytes=None, maxtrees=TREES):
+        """
+        Constructor
+
+        :param maxsize:  the maximum number of cached results
+        :param maxbytes: optional bound on the memory held by the cached results
+        :param maxtrees: the maximum number of kept shortest-path trees
+        """
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.maxtrees = maxtrees
+        self.entries = OrderedDict()
+        self.trees = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def size_of(result):
+        """
+        Returns the approximate number of bytes held by a SearchResult
+        """
+        # the tables are arrays, or dicts (maze.tiled.SparseTable) of the entries set
+        size = sys.getsizeof(result.prev)
+        if result.closed is not None:
+            size += sys.getsizeof(result.closed)
+        return size
+
+    def solve(self, grid, start, target, algorithm="A*"):
+        """
+        Returns the cached result of the query, running the search on a miss
+        """
+        if algorithm == "Dijkstra":
+            return self.tree(grid, start, target)
+        key = (fingerprint(grid).key(), start, target, algorithm)
+        result = self.entries.get(key)
+        if result is not None and fingerprint(result.grid).key() != key[0]:
+            self.nbytes -= self.size_of(self.entries.pop(key))
+            result = None
+        if result is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+        self.misses += 1
+        result = solve(grid, start, target, algorithm)
+        self.entries[key] = result
+        self.nbytes += self.size_of(result)
+        while self.entries and (len(self.entries) > self.maxsize or
+                                (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+            _, old = self.entries.popitem(last=False)
+            self.nbytes -= self.size_of(old)
+            self.evictions += 1
+        return result
+
+    def tree(self, grid, start, target):
+        """
+        Answers a Dijkstra query from the shortest-path tree of start, growing it if needed
+        """
+        key = (fingerprint(grid).key(), start)
+        tree = self.trees.get(key)
+        if tree is not None and fingerprint(tree.grid).key() != key[0]:
+            # the tree would grow on the obstacles of its own grid
+            del self.trees[key]
+            tree = None
+        if tree is None:
+            tree = self.trees[key] = ShortestPathTree(grid, start)
+            if len(self.trees) > self.maxtrees:
+                self.trees.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.trees.move_to_end(key)
+        result = tree.query(target)
+        if result.expanded:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def clear(self):
+        self.entries.clear()
+        self.trees.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns the hit/miss statistics of the cache
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self.entries), "trees": len(self.trees), "bytes": self.nbytes,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
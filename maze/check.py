@@ -0,0 +1,367 @@
+"""
+Property-based checks of the solvers: python -m maze check [--grids N] [--seed S]
+
+Every search mode is run between random cells of seeded random grids (random
+obstacles, rectangular, with terrain costs on some of them) and of the mazes of
+maze.generate, and its results are checked against a plain Dijkstra written
+independently of maze.grid and maze.solver:
+
+- a route starts at the robot, ends at the target and only makes legal moves:
+  to one of the eight neighbours, onto a free cell, and diagonally only if one
+  of the two cells passed by is free (the corner rule);
+- the cost of a route, recomputed from its moves, is the cost reported, and the
+  optimal cost for the exact modes; HPA* may be longer but never shorter;
+- the segments of an any-angle route are in line of sight. The route is no
+  longer than the optimal grid route, except with Lazy Theta* whose lines of
+  sight are only assumed when its nodes are reached, and never shorter than
+  the optimal grid route divided by OCTILE_RATIO;
+- a route is found exactly when the target is reachable.
+
+Every mode is also timed: its mean time per search on the grids of each size,
+including the time to build its graph if any, must stay within the budget of
+the size in BUDGETS, times the factor of the mode for the slower ones.
+"""
+import heapq
+import math
+import random
+import time
+
+import numpy
+
+from maze.grid import Grid, EMPTY, OBST
+
+SIZES = (8, 16, 32, 64)  # the sides of the grids checked
+QUERIES = 4              # the searches per grid
+TOLERANCE = 1e-9         # the relative error allowed on costs
+# the most seconds a search of A* may take on average, by side of the grid
+BUDGETS = {8: 0.0005, 16: 0.001, 32: 0.004, 64: 0.015}
+
+# the most a grid route can be longer than a straight segment, 1 / cos(22.5 degrees)
+OCTILE_RATIO = 1 / math.cos(math.pi / 8)
+
+EXACT = "exact"          # optimal routes
+BOUNDED = "bounded"      # legal routes, never shorter than the optimal ones
+ANY_ANGLE = "any-angle"  # routes of waypoints in line of sight, no longer than the optimal grid routes
+LAZY = "lazy"            # routes of waypoints in line of sight
+
+# the (row, col) offsets of the eight moves
+NEIGHBOURS = tuple((dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc)
+
+
+def move_cost(free, costs, a, b):
+    """
+    Returns the cost of the move between two cells, INFINITY if it is not legal
+
+    :param free:  2d list of the free flags of the cells
+    :param costs: 2d list of the terrain costs of the cells, or None
+    :param a:     (row, col) of the cell left
+    :param b:     (row, col) of the cell reached
+    """
+    (r0, c0), (r1, c1) = a, b
+    dr = r1 - r0
+    dc = c1 - c0
+    if max(abs(dr), abs(dc)) != 1 or not (0 <= r1 < len(free) and 0 <= c1 < len(free[0])):
+        return math.inf
+    if not free[r0][c0] or not free[r1][c1]:
+        return math.inf
+    if dr and dc and not free[r0][c1] and not free[r1][c0]:
+        # the corner rule
+        return math.inf
+    length = math.sqrt(2) if dr and dc else 1.0
+    if costs is None:
+        return length
+    return length * (costs[r0][c0] + costs[r1][c1]) / 2
+
+
+def reference_distances(free, costs, start):
+    """
+    Returns the distances from start to every reachable cell, by a plain Dijkstra
+
+    :param start: (row, col) of the robot
+    :return:      dict of the distances by (row, col)
+    """
+    dist = {}
+    queue = [(0.0, start)]
+    while queue:
+        d, cell = heapq.heappop(queue)
+        if cell in dist:
+            continue
+        dist[cell] = d
+        r, c = cell
+        for dr, dc in NEIGHBOURS:
+            other = (r + dr, c + dc)
+            step = move_cost(free, costs, cell, other)
+            if step < math.inf and other not in dist:
+                heapq.heappush(queue, (d + step, other))
+    return dist
+
+
+def route_cost(free, costs, cells):
+    """
+    Returns the cost of a route given as a list of (row, col)
+
+    :raise ValueError: if the route makes an illegal move
+    """
+    cost = 0.0
+    for a, b in zip(cells, cells[1:]):
+        step = move_cost(free, costs, a, b)
+        if step == math.inf:
+            raise ValueError("illegal move from {0} to {1}".format(a, b))
+        cost += step
+    return cost
+
+
+def close(a, b):
+    """
+    Returns True if two costs are equal but for rounding errors
+    """
+    return abs(a - b) <= TOLERANCE * max(1.0, abs(a), abs(b))
+
+
+def check_result(grid, free, costs, kind, result, start, target, optimal):
+    """
+    Checks a SearchResult against the optimal cost of its query
+
+    :param optimal: the cost of the optimal grid route, INFINITY if there is none
+    :return:        a description of the first problem found, None if none
+    """
+    from maze.anyangle import line_of_sight, path_length
+
+    if result.found != (optimal < math.inf):
+        return "found is {0} but the target is {1}reachable".format(
+            result.found, "" if optimal < math.inf else "not ")
+    if not result.found:
+        return None
+    cells = [grid.coords(node) for node in result.iter_nodes()]
+    if cells[0] != grid.coords(start) or cells[-1] != grid.coords(target):
+        return "the route goes from {0} to {1}".format(cells[0], cells[-1])
+    try:
+        cost = route_cost(free, costs, cells)
+    except ValueError as error:
+        return str(error)
+    if kind in (ANY_ANGLE, LAZY):
+        waypoints = list(result.iter_waypoints())
+        for u, v in zip(waypoints, waypoints[1:]):
+            if not line_of_sight(grid, u, v):
+                return "no line of sight from {0} to {1}".format(grid.coords(u), grid.coords(v))
+        cost = path_length(waypoints, grid.columns)
+    if not close(cost, result.cost):
+        return "the cost is {0!r} but the route costs {1!r}".format(result.cost, cost)
+    if kind == EXACT and not close(cost, optimal):
+        return "the route costs {0!r} but the optimal cost is {1!r}".format(cost, optimal)
+    if kind == BOUNDED and cost < optimal and not close(cost, optimal):
+        return "the route costs {0!r}, less than the optimal cost {1!r}".format(cost, optimal)
+    if kind == ANY_ANGLE and cost > optimal and not close(cost, optimal):
+        return "the route costs {0!r}, more than the grid route {1!r}".format(cost, optimal)
+    if kind in (ANY_ANGLE, LAZY) and cost * OCTILE_RATIO < optimal and not close(cost * OCTILE_RATIO, optimal):
+        # the cells of a segment are a grid route at most OCTILE_RATIO times longer
+        return "the route costs {0!r}, too little for the grid route {1!r}".format(cost, optimal)
+    return None
+
+
+def search_modes():
+    """
+    Returns the search modes checked, as (name, kind, prepare, factor) where
+    prepare(grid) returns a function (start, target) -> SearchResult on that
+    grid, or None if the mode does not apply to the grid, and factor is the
+    number of times the budgets of A* the mode is allowed
+    """
+    from maze.corridors import CorridorGraph
+    from maze.hierarchy import ClusterGraph
+    from maze.multi import multi_source_dijkstra, nearest_target
+    from maze.solver import ShortestPathTree, astar, frontier_astar, solve
+    from maze.tiled import TiledGrid
+
+    def algorithm(name, plain=False):
+        def prepare(grid):
+            if plain and grid.costs is not None:
+                return None
+            return lambda start, target: solve(grid, start, target, name)
+        return prepare
+
+    def smoothed(grid):
+        if grid.costs is not None:
+            return None
+        return lambda start, target: astar(grid, start, target).smoothed()
+
+    def tree(grid):
+        trees = {}
+
+        def query(start, target):
+            if start not in trees:
+                trees[start] = ShortestPathTree(grid, start)
+            return trees[start].query(target)
+        return query
+
+    def corridors(name):
+        def prepare(grid):
+            graph = CorridorGraph(grid)
+            return lambda start, target: graph.solve(start, target, name)
+        return prepare
+
+    def clusters(grid):
+        graph = ClusterGraph(grid, 8)
+        return graph.solve
+
+    def tiled(search):
+        def prepare(grid):
+            if grid.costs is not None:
+                return None
+            # small tiles and cache, so that routes cross tiles and tiles are evicted
+            tiles = TiledGrid(grid.cells, tile_size=5, max_tiles=4)
+            return lambda start, target: search(tiles, start, target)
+        return prepare
+
+    return (
+        ("A*", EXACT, algorithm("A*"), 1),
+        ("Dijkstra", EXACT, algorithm("Dijkstra"), 1),
+        ("Frontier A*", EXACT, algorithm("Frontier A*"), 3),
+        ("ShortestPathTree", EXACT, tree, 1),
+        ("corridors A*", EXACT, corridors("A*"), 2),
+        ("corridors Dijkstra", EXACT, corridors("Dijkstra"), 2),
+        ("nearest_target", EXACT, lambda grid: lambda start, target: nearest_target(grid, start, [target]), 1),
+        ("multi_source_dijkstra", EXACT,
+         lambda grid: lambda start, target: multi_source_dijkstra(grid, [target]).result(start), 1),
+        ("tiled A*", EXACT, tiled(astar), 3),
+        ("tiled Frontier A*", EXACT, tiled(frontier_astar), 8),
+        ("HPA*", BOUNDED, clusters, 3),
+        ("Theta*", ANY_ANGLE, algorithm("Theta*", plain=True), 1),
+        ("Lazy Theta*", LAZY, algorithm("Lazy Theta*", plain=True), 1),
+        ("smoothed A*", ANY_ANGLE, smoothed, 1),
+    )
+
+
+def random_grid(rnd, size):
+    """
+    Returns a random grid of size rows and up to size columns, with terrain
+    costs one time out of three. Half of the grids with costs have their
+    cheapest free cells painted as obstacles first and then cleared with
+    Grid.set(), which must keep the heuristics from overestimating.
+    """
+    columns = rnd.randint(max(size // 2, 1), size)
+    rng = numpy.random.default_rng(rnd.getrandbits(32))
+    cells = (rng.random((size, columns)) < rnd.choice((0.0, 0.1, 0.25, 0.4))).astype(numpy.uint8)
+    costs = rng.integers(1, 10, (size, columns)).astype(numpy.uint8) if rnd.random() < 1 / 3 else None
+    if costs is None or rnd.random() < 0.5:
+        return Grid(cells, costs)
+    cheapest = (costs == costs.min()) & (cells != OBST)
+    grid = Grid(numpy.where(cheapest, OBST, cells), costs)
+    for row, col in zip(*numpy.nonzero(cheapest)):
+        grid.set(int(row), int(col), EMPTY)
+    return grid
+
+
+def random_maze(rnd, size):
+    """
+    Returns a maze of a random generator with about size rows and columns
+    """
+    from maze.generate import GENERATORS, generator
+
+    name = rnd.choice(sorted(GENERATORS))
+    return Grid(generator(name, size // 2, size // 2, rnd.getrandbits(32)).grid()), name
+
+
+class Report(object):
+    """
+    The failures and the times of a run of the checks
+    """
+
+    def __init__(self):
+        self.failures = []  # descriptions of the failures
+        self.times = {}     # (mode, size) -> [total seconds, searches]
+        self.searches = 0
+
+    def add_time(self, mode, size, elapsed, searches=0):
+        """
+        Adds the time of a mode on a grid of a size, and the searches it took
+        """
+        entry = self.times.setdefault((mode, size), [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += searches
+
+    def mean(self, mode, size):
+        """
+        Returns the mean seconds per search of a mode on the grids of a size
+        """
+        total, searches = self.times.get((mode, size), (0.0, 0))
+        return total / searches if searches else 0.0
+
+    def check_budgets(self, modes=None, budgets=BUDGETS, scale=1.0):
+        """
+        Records a failure for every mode slower than its budget on a size of grid
+
+        :param scale: multiplies every budget, for slower machines
+        """
+        factors = {name: factor for name, _, _, factor in modes or search_modes()}
+        for (mode, size), (total, searches) in sorted(self.times.items()):
+            budget = scale * factors[mode] * budgets[size]
+            if searches and total / searches > budget:
+                self.failures.append("{0} takes {1:.3f}ms per search on {2}x{2} grids, the budget is {3:.3f}ms".format(
+                    mode, 1000 * total / searches, size, 1000 * budget))
+
+
+def check_grid(report, grid, size, description, rnd, queries=QUERIES, modes=None):
+    """
+    Runs every mode between random free cells of a grid and checks the results
+    """
+    free_cells = [node for node in range(len(grid)) if grid.free[node]]
+    if not free_cells:
+        return
+    free = (grid.cells != OBST).tolist()
+    costs = grid.costs.astype(numpy.float64).tolist() if grid.costs is not None else None
+    pairs = []
+    for _ in range(queries):
+        start = rnd.choice(free_cells)
+        pairs.append((start, start if rnd.random() < 0.05 else rnd.choice(free_cells)))
+    distances = {}
+    for start, _ in pairs:
+        if start not in distances:
+            distances[start] = reference_distances(free, costs, grid.coords(start))
+    for name, kind, prepare, _ in modes or search_modes():
+        begin = time.perf_counter()
+        try:
+            search = prepare(grid)
+        except Exception as error:
+            report.failures.append("{0} on {1}: {2!r}".format(name, description, error))
+            continue
+        report.add_time(name, size, time.perf_counter() - begin)
+        if search is None:
+            continue
+        for start, target in pairs:
+            begin = time.perf_counter()
+            try:
+                result = search(start, target)
+            except Exception as error:
+                problem = repr(error)
+            else:
+                report.add_time(name, size, time.perf_counter() - begin, 1)
+                optimal = distances[start].get(grid.coords(target), math.inf)
+                problem = check_result(grid, free, costs, kind, result, start, target, optimal)
+            report.searches += 1
+            if problem is not None:
+                report.failures.append("{0} on {1} from {2} to {3}: {4}".format(
+                    name, description, grid.coords(start), grid.coords(target), problem))
+
+
+def run_checks(grids, seed=0, sizes=SIZES, queries=QUERIES):
+    """
+    Checks every mode on grids random grids and mazes, alternately, cycling
+    through the sizes so that every size gets both kinds of grid; the grid i
+    is built from the seed (seed, i)
+
+    :return: a Report, without the timing budgets checked
+    """
+    report = Report()
+    modes = search_modes()
+    for i in range(grids):
+        rnd = random.Random("{0}/{1}".format(seed, i))
+        # a random grid and a maze of every size in turn
+        size = sizes[(i // 2) % len(sizes)]
+        if i % 2:
+            grid, name = random_maze(rnd, size)
+            description = "{0} maze #{1} (seed {2})".format(name, i, seed)
+        else:
+            grid = random_grid(rnd, size)
+            description = "random grid #{0} (seed {1})".format(i, seed)
+        check_grid(report, grid, size, description, rnd, queries, modes)
+    return report
@@ -0,0 +1,359 @@
+"""
+Command line entry point of the headless solver: python -m maze <command> ...
+
+Only argparse is imported up front; every command imports the modules it needs
+when it runs, so that the workers never pay for the GUI or for solvers they do
+not use.
+"""
+import argparse
+import sys
+
+STARTUP_BUDGET = 0.5  # seconds allowed to a cold start of the solver core
+STARTUP_RUNS = 5
+
+# the names of maze.solver.ALGORITHMS, without importing the solvers
+ALGORITHMS = ("A*", "Dijkstra", "Theta*", "Lazy Theta*", "Frontier A*")
+
+MSG_NO_SOLUTION = "There is no path to the target !!!"
+
+
+def parse_cell(text):
+    """
+    Parses a "row,col" command line argument
+    """
+    try:
+        row, col = (int(value) for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected ROW,COL but got {0!r}".format(text))
+    return row, col
+
+
+def open_maze(args):
+    """
+    Loads the .maze file, or opens the .npy grid file, of a command, with the
+    robot and the target overridden by --start and --target
+
+    :return: (grid, start, target); start and target are node ids or None if missing
+    :raise ValueError: if --start or --target is outside the maze
+    """
+    if args.file.endswith(".npy"):
+        # out-of-core grid: the robot and the target are given on the command line
+        from maze.tiled import open_grid
+        grid = open_grid(args.file, args.tile_size, args.max_tiles)
+        start = target = None
+    else:
+        from maze.io import load_maze
+        grid, start, target = load_maze(args.file)
+    for option, cell in (("--start", args.start), ("--target", args.target)):
+        if cell is not None and not (0 <= cell[0] < grid.rows and 0 <= cell[1] < grid.columns):
+            raise ValueError("{0} {1},{2} is outside the {3}x{4} maze".format(
+                option, cell[0], cell[1], grid.rows, grid.columns))
+    if args.start is not None:
+        start = grid.node(*args.start)
+    if args.target is not None:
+        target = grid.node(*args.target)
+    return grid, start, target
+
+
+def search_options(args, algorithm):
+    """
+    Returns the options of maze.solver.solve() given by a command for an algorithm
+    """
+    if algorithm == "Frontier A*" and args.max_nodes is not None:
+        return {"max_nodes": args.max_nodes}
+    return {}
+
+
+def solve_command(args):
+    """
+    Solves a .maze file and prints the same summary as the GUI
+    """
+    if args.file.endswith(".npy") and args.graph != "grid":
+        print("only --graph grid can search a .npy grid", file=sys.stderr)
+        return 2
+    try:
+        grid, start, target = open_maze(args)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if start is None or target is None:
+        print("the maze has no robot (S) or no target (T)", file=sys.stderr)
+        return 2
+    if args.graph != "grid" and args.algorithm not in ("A*", "Dijkstra"):
+        print("--graph {0} searches with A* or Dijkstra only".format(args.graph), file=sys.stderr)
+        return 2
+    if args.graph == "corridors":
+        from maze.corridors import CorridorGraph
+        result = CorridorGraph(grid).solve(start, target, args.algorithm)
+    elif args.graph == "clusters":
+        from maze.hierarchy import ClusterGraph
+        result = ClusterGraph(grid, args.cluster_size).solve(start, target)
+    else:
+        from maze.solver import NodeLimitExceeded, solve
+        try:
+            result = solve(grid, start, target, args.algorithm, **search_options(args, args.algorithm))
+        except NodeLimitExceeded as error:
+            print(error, file=sys.stderr)
+            return 1
+    if not result.found:
+        print(MSG_NO_SOLUTION)
+        return 1
+    if args.smooth:
+        result = result.smoothed()
+    if args.route:
+        result.write_route(sys.stdout)
+    elif args.segments:
+        for (row, col), direction, length in result.segments():
+            print(row, col, direction, length)
+    steps, distance = result.stats()
+    print("Nodes expanded: {0}, Steps: {1}, Distance: {2:.3f}".format(result.expanded, steps, distance),
+          file=sys.stderr if args.route or args.segments else sys.stdout)
+    return 0
+
+
+def memory_command(args):
+    """
+    Prints the time and the peak memory of the searches of a maze
+    """
+    from maze.bench import search_memory
+    from maze.solver import NodeLimitExceeded
+
+    try:
+        grid, start, target = open_maze(args)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if start is None or target is None:
+        print("the maze has no robot (S) or no target (T)", file=sys.stderr)
+        return 2
+    for algorithm in args.algorithms or ("A*", "Frontier A*"):
+        try:
+            elapsed, peak, result = search_memory(grid, start, target, algorithm, **search_options(args, algorithm))
+        except NodeLimitExceeded as error:
+            print("{0:<12} {1}".format(algorithm, error))
+            continue
+        print("{0:<12} {1:>9.3f}s {2:>14,} bytes {3:>12,} expanded".format(
+            algorithm, elapsed, peak, result.expanded))
+    return 0
+
+
+def check_command(args):
+    """
+    Cross-checks the solvers against a reference Dijkstra and checks their timing budgets
+    """
+    from maze.check import SIZES, run_checks
+
+    report = run_checks(args.grids, args.seed, queries=args.queries)
+    if args.budget_scale > 0:
+        report.check_budgets(scale=args.budget_scale)
+    modes = sorted(set(mode for mode, size in report.times))
+    print("{0:<22}".format("ms per search") + "".join("{0:>10}".format("{0}x{0}".format(size)) for size in SIZES))
+    for mode in modes:
+        print("{0:<22}".format(mode) + "".join("{0:>10.3f}".format(1000 * report.mean(mode, size)) for size in SIZES))
+    for failure in report.failures:
+        print(failure)
+    print("{0} searches on {1} grids, {2} failures".format(report.searches, args.grids, len(report.failures)))
+    return 1 if report.failures else 0
+
+
+def startup_command(args):
+    """
+    Measures the cold start time and checks it against the budget
+    """
+    from maze.bench import measure_startup
+
+    times = sorted(measure_startup(args.runs))
+    median = times[len(times) // 2]
+    print("cold start: median {0:.3f}s, min {1:.3f}s, max {2:.3f}s, budget {3:.3f}s".format(
+        median, times[0], times[-1], args.budget))
+    return 0 if median <= args.budget else 1
+
+
+def generate_command(args):
+    """
+    Generates a random maze and streams it to a .maze file, with the robot
+    and the target at the corners used by the GUI, or to a .npy grid file
+    """
+    from maze.generate import generator
+
+    try:
+        maker = generator(args.generator, args.height, args.width, args.seed)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 2
+    if args.output.endswith(".npy"):
+        from maze.tiled import save_grid
+        save_grid(args.output, maker.iter_rows(), maker.rows, maker.columns)
+        return 0
+    from maze.io import write_rows
+    start = (maker.rows - 2, 1)
+    target = (1, maker.columns - 2)
+    with open(args.output, "w") as fp:
+        write_rows(fp, maker.iter_rows(), start, target)
+    return 0
+
+
+def bench_command(args):
+    """
+    Prints the throughput of the maze generators
+    """
+    from maze.bench import generator_throughput
+    from maze.generate import GENERATORS
+
+    for name in args.generators or sorted(GENERATORS):
+        if name not in GENERATORS:
+            print("unknown maze generator: {0}".format(name), file=sys.stderr)
+            return 2
+        rate = generator_throughput(name, args.size, args.size, args.repeat)
+        print("{0:<14} {1:>14,.0f} cells/s".format(name, rate))
+    return 0
+
+
+def serve_command(args):
+    """
+    Serves the given .maze files until interrupted
+    """
+    import asyncio
+    from maze.service import serve
+
+    try:
+        asyncio.run(serve(args.files, args.host, args.port, args.socket, workers=args.workers,
+                          batch_size=args.batch_size, batch_delay=args.batch_delay))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def load_command(args):
+    """
+    Sends random solve requests to a solve service and prints the latency percentiles
+    """
+    import asyncio
+    import time
+    from maze.bench import load, percentile, random_queries
+    from maze.io import load_maze
+    from maze.service import SolveServer, maze_name
+
+    grid = load_maze(args.file)[0]
+    name = maze_name(args.file)
+    queries = random_queries(grid, name, args.requests, args.algorithm, args.seed)
+
+    async def run():
+        server = None
+        if args.local:
+            server = SolveServer({name: grid}, args.workers)
+            await server.start(args.host, args.port, args.socket)
+        try:
+            begin = time.perf_counter()
+            latencies, responses = await load(queries, args.concurrency, args.host, args.port, args.socket)
+            return latencies, responses, time.perf_counter() - begin, server and server.batches
+        finally:
+            if server is not None:
+                await server.close()
+
+    latencies, responses, elapsed, batches = asyncio.run(run())
+    errors = sum(1 for response in responses if "error" in response)
+    print("{0} requests in {1:.3f}s ({2:.0f}/s), {3} errors".format(
+        len(latencies), elapsed, len(latencies) / elapsed, errors))
+    if batches:
+        print("{0} batches, {1:.1f} requests per batch".format(batches, len(latencies) / batches))
+    print("latency: p50 {0:.2f}ms, p99 {1:.2f}ms, max {2:.2f}ms".format(
+        1000 * percentile(latencies, 50), 1000 * percentile(latencies, 99), 1000 * max(latencies)))
+    return 1 if errors else 0
+
+
+def add_maze(parser):
+    """
+    Adds the arguments of the maze of a command, see open_maze()
+    """
+    parser.add_argument("file", help="the .maze file, or a .npy grid file searched out of core")
+    parser.add_argument("--tile-size", type=int, default=256, help="the side of a tile (.npy grids)")
+    parser.add_argument("--max-tiles", type=int, default=64, help="the tiles kept in memory (.npy grids)")
+    parser.add_argument("--start", type=parse_cell, metavar="ROW,COL", help="overrides the robot (S)")
+    parser.add_argument("--target", type=parse_cell, metavar="ROW,COL", help="overrides the target (T)")
+    parser.add_argument("--max-nodes", type=int, help="the memory ceiling of Frontier A*, in open nodes")
+
+
+def add_address(parser):
+    """
+    Adds the options of the address of the solve service
+    """
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH", help="listen on a Unix socket instead of TCP")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m maze", description="Headless maze solver")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    solve = commands.add_parser("solve", help="solve a .maze file")
+    add_maze(solve)
+    solve.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="A*")
+    solve.add_argument("-g", "--graph", choices=("grid", "corridors", "clusters"), default="grid",
+                       help="search the cells, the contracted corridors or the clusters (HPA*)")
+    solve.add_argument("--cluster-size", type=int, default=16, help="the side of a cluster (HPA*)")
+    solve.add_argument("--smooth", action="store_true", help="shorten the route by path smoothing")
+    output = solve.add_mutually_exclusive_group()
+    output.add_argument("--route", action="store_true", help="print the cells of the route")
+    output.add_argument("--segments", action="store_true", help="print the route as segments")
+    solve.set_defaults(run=solve_command)
+
+    memory = commands.add_parser("memory", help="measure the time and the peak memory of the searches")
+    add_maze(memory)
+    memory.add_argument("-a", "--algorithm", dest="algorithms", action="append", choices=ALGORITHMS,
+                        help="an algorithm to measure, A* and Frontier A* by default")
+    memory.set_defaults(run=memory_command)
+
+    check = commands.add_parser("check", help="cross-check the solvers against a reference Dijkstra")
+    check.add_argument("--grids", type=int, default=1000, help="random grids and mazes, alternately")
+    check.add_argument("--queries", type=int, default=4, help="searches per grid and algorithm")
+    check.add_argument("--seed", type=int, default=0)
+    check.add_argument("--budget-scale", type=float, default=1.0,
+                       help="multiplies the timing budgets, 0 to skip them")
+    check.set_defaults(run=check_command)
+
+    startup = commands.add_parser("startup", help="measure the cold start time of the solver core")
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="seconds allowed")
+    startup.add_argument("--runs", type=int, default=STARTUP_RUNS)
+    startup.set_defaults(run=startup_command)
+
+    generate = commands.add_parser("generate", help="write a random maze to a .maze file")
+    generate.add_argument("generator", help="growing-tree, eller, binary-tree, sidewinder or kruskal")
+    generate.add_argument("height", type=int, help="the number of rows of maze cells")
+    generate.add_argument("width", type=int, help="the number of columns of maze cells")
+    generate.add_argument("output", help="the .maze or .npy file to write")
+    generate.add_argument("--seed", type=int)
+    generate.set_defaults(run=generate_command)
+
+    bench = commands.add_parser("bench", help="measure the throughput of the maze generators")
+    bench.add_argument("generators", nargs="*", metavar="GENERATOR", help="all of them by default")
+    bench.add_argument("--size", type=int, default=256, help="the side of the mazes, in cells")
+    bench.add_argument("--repeat", type=int, default=3)
+    bench.set_defaults(run=bench_command)
+
+    serve = commands.add_parser("serve", help="serve solve requests on the given mazes")
+    serve.add_argument("files", nargs="+", metavar="FILE", help=".maze files, served by name")
+    add_address(serve)
+    serve.add_argument("--workers", type=int, help="worker processes, one per CPU by default")
+    serve.add_argument("--batch-size", type=int, default=64, help="the most requests in a batch")
+    serve.add_argument("--batch-delay", type=float, default=0.002, help="seconds a batch waits")
+    serve.set_defaults(run=serve_command)
+
+    load = commands.add_parser("load", help="measure the latency of a solve service")
+    load.add_argument("file", help="the .maze file served, to pick the requests")
+    add_address(load)
+    load.add_argument("--local", action="store_true", help="start the service in this process")
+    load.add_argument("--workers", type=int, help="worker processes of the local service")
+    load.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="A*")
+    load.add_argument("-n", "--requests", type=int, default=1000)
+    load.add_argument("-c", "--concurrency", type=int, default=16, help="concurrent clients")
+    load.add_argument("--seed", type=int, default=0)
+    load.set_defaults(run=load_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.run(args)
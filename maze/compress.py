@@ -0,0 +1,121 @@
+"""
+Compact encodings of routes and grids.
+
+Routes through generated mazes are mostly long straight corridors, so they are
+stored as segments ((row, col), direction, length): starting at (row, col), make
+`length` moves in the direction MOVES[direction]. Grids are run-length encoded
+over their flattened cells.
+"""
+import numpy
+
+from maze.grid import MOVES, SQRT2
+
+DIRECTIONS = {move: i for i, move in enumerate(MOVES)}
+
+
+def iter_segments(cells):
+    """
+    Yields the segments of a route given as (row, col) pairs, without
+    buffering more than the segment under construction
+
+    :param cells: iterable of (row, col), from start to target
+    """
+    start = last = None
+    direction = None
+    length = 0
+    for row, col in cells:
+        if last is None:
+            start = last = (row, col)
+            continue
+        try:
+            move = DIRECTIONS[(row - last[0], col - last[1])]
+        except KeyError:
+            raise ValueError("cells {0} and {1} are not adjacent".format(last, (row, col)))
+        if move == direction:
+            length += 1
+        else:
+            if direction is not None:
+                yield start, direction, length
+            start, direction, length = last, move, 1
+        last = (row, col)
+    if direction is not None:
+        yield start, direction, length
+    elif start is not None:
+        # a route of a single cell (the robot is on the target)
+        yield start, 0, 0
+
+
+def segments(cells):
+    """
+    Returns the list of segments of a route given as (row, col) pairs
+    """
+    return list(iter_segments(cells))
+
+
+def expand_segments(segs):
+    """
+    Yields the (row, col) of every cell covered by a list of segments
+    """
+    first = True
+    for (row, col), direction, length in segs:
+        dr, dc = MOVES[direction]
+        if first:
+            yield row, col
+            first = False
+        for i in range(1, length + 1):
+            yield row + i * dr, col + i * dc
+
+
+def segments_stats(segs):
+    """
+    Returns the (steps, distance) of a route straight from its segments,
+    with the same meaning as the message shown by Maze.plot_route
+    """
+    straight = 0
+    diagonal = 0
+    for _, direction, length in segs:
+        if direction % 2:
+            diagonal += length
+        else:
+            straight += length
+    return straight + diagonal, straight + diagonal * SQRT2
+
+
+def encode_grid(cells):
+    """
+    Run-length encodes a 2d array of cell values row by row
+
+    :return: (shape, values, lengths) where values[i] is repeated lengths[i] times
+    """
+    cells = numpy.asarray(cells)
+    flat = cells.ravel()
+    if not flat.size:
+        return cells.shape, flat[:0].copy(), numpy.zeros(0, dtype=numpy.int64)
+    # the positions where a new run begins
+    starts = numpy.concatenate(([0], numpy.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = numpy.diff(numpy.append(starts, flat.size))
+    return cells.shape, flat[starts].copy(), lengths
+
+
+def decode_grid(shape, values, lengths):
+    """
+    Inverse of encode_grid()
+    """
+    return numpy.repeat(values, lengths).reshape(shape)
+
+
+def pack_segments(segs):
+    """
+    Serializes a list of segments to bytes (four little-endian int32 per segment)
+    """
+    flat = [value for (row, col), direction, length in segs
+            for value in (row, col, direction, length)]
+    return numpy.array(flat, dtype='<i4').tobytes()
+
+
+def unpack_segments(data):
+    """
+    Inverse of pack_segments()
+    """
+    table = numpy.frombuffer(data, dtype='<i4').reshape(-1, 4).tolist()
+    return [((row, col), direction, length) for row, col, direction, length in table]
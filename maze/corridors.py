@@ -0,0 +1,272 @@
+"""
+Corridor contraction of a grid.
+
+In a maze most free cells have exactly two passable neighbours. CorridorGraph
+collapses every chain of such cells into a single weighted edge between the
+cells around it (junctions and dead ends), so that A* and Dijkstra expand
+junctions instead of cells. The corridors are expanded back to cells only for
+the route that is finally found.
+
+With diagonal moves every turn of a corridor is a small triangle: the corner
+cell is passed by the diagonal move, which is never longer than the detour
+through the corner (unless the terrain costs say otherwise). Such corner cells
+are pruned before contracting, otherwise every turn would leave two junctions
+behind.
+
+The graph describes the grid at the time it was built; it must be rebuilt
+after obstacles are added or removed.
+"""
+import heapq
+import math
+from array import array
+
+import numpy
+
+from maze.grid import OBST
+from maze.solver import SearchResult, INFINITY, new_prev
+
+
+def degree_map(grid, exclude=None):
+    """
+    Returns a rows x columns array with the number of successors of every free
+    cell (0 for obstacles), following the same rules as Grid.successors
+
+    :param exclude: optional boolean array of free cells not to be counted as successors
+    """
+    free = grid.cells != OBST
+    nodes = free if exclude is None else free & ~exclude
+    pad = numpy.zeros((grid.rows + 2, grid.columns + 2), dtype=bool)
+    pad[1:-1, 1:-1] = free
+    pad_nodes = numpy.zeros_like(pad)
+    pad_nodes[1:-1, 1:-1] = nodes
+    up = pad[:-2, 1:-1]
+    down = pad[2:, 1:-1]
+    left = pad[1:-1, :-2]
+    right = pad[1:-1, 2:]
+    degree = (pad_nodes[:-2, 1:-1].astype(numpy.uint8) + pad_nodes[2:, 1:-1] +
+              pad_nodes[1:-1, :-2] + pad_nodes[1:-1, 2:])
+    degree += pad_nodes[:-2, 2:] & (up | right)
+    degree += pad_nodes[2:, 2:] & (down | right)
+    degree += pad_nodes[2:, :-2] & (down | left)
+    degree += pad_nodes[:-2, :-2] & (up | left)
+    degree[~free] = 0
+    return degree
+
+
+class CorridorGraph(object):
+    """
+    The graph of the junctions of a grid, with the corridors as weighted edges
+    """
+
+    def __init__(self, grid):
+        """
+        Constructor
+
+        :param grid: the maze.grid.Grid to contract
+        """
+        self.grid = grid
+        columns = grid.columns
+        free = (grid.cells != OBST).ravel()
+        # 1 for the corner cells that are left out of the graph
+        self.pruned = bytearray(len(grid))
+        for cell in numpy.flatnonzero(free & (degree_map(grid).ravel() == 2)).tolist():
+            (a, to_a), (b, to_b) = grid.successors(cell)
+            if self.pruned[a] or self.pruned[b]:
+                continue
+            ar, ac = divmod(a, columns)
+            br, bc = divmod(b, columns)
+            # with terrain costs the detour may be cheaper than the direct move
+            if abs(ar - br) <= 1 and abs(ac - bc) <= 1 and to_a + to_b >= grid.cost_between(a, b):
+                self.pruned[cell] = 1
+        pruned = numpy.frombuffer(bytes(self.pruned), dtype=bool)
+        degree = degree_map(grid, pruned.reshape(grid.rows, columns)).ravel()
+        nodes = free & ~pruned
+        # 1 for the cells that are kept as nodes of the graph
+        self.junction = bytearray((nodes & (degree != 2)).tobytes())
+        # the edges; every corridor appears once in each direction
+        self.edge_u = array('q')
+        self.edge_v = array('q')
+        self.edge_first = array('q')  # the cell right after edge_u
+        self.edge_cost = array('d')
+        self.adj = {}                 # junction -> ids of its outgoing edges
+        self._seen = bytearray(len(grid))
+        for u in numpy.flatnonzero(nodes & (degree != 2)).tolist():
+            self._add_junction(u)
+        # closed loops of corridor cells have no junction at all,
+        # so one of their cells is promoted to junction
+        for cell in numpy.flatnonzero(nodes & (degree == 2)).tolist():
+            if not self._seen[cell]:
+                self.junction[cell] = 1
+                self._add_junction(cell)
+        del self._seen
+
+    def __len__(self):
+        return len(self.adj)
+
+    def successors(self, u):
+        """
+        Returns the (node, step cost) pairs reachable from u, skipping pruned cells
+        """
+        return [(v, step) for v, step in self.grid.successors(u) if not self.pruned[v]]
+
+    def _next(self, cur, last):
+        """
+        Returns the (cell, step cost) that follows cur in a corridor entered from last
+        """
+        for v, step in self.successors(cur):
+            if v != last:
+                return v, step
+
+    def _add_junction(self, u):
+        """
+        Walks all corridors leaving junction u and adds them as edges
+        """
+        edges = self.adj[u] = []
+        for first, cost in self.successors(u):
+            last, cur = u, first
+            while not self.junction[cur]:
+                self._seen[cur] = 1
+                nxt, step = self._next(cur, last)
+                cost += step
+                last, cur = cur, nxt
+            edges.append(len(self.edge_u))
+            self.edge_u.append(u)
+            self.edge_v.append(cur)
+            self.edge_first.append(first)
+            self.edge_cost.append(cost)
+
+    def corridor(self, e):
+        """
+        Returns the cells of edge e, both junctions included
+        """
+        cells = [self.edge_u[e]]
+        last, cur = cells[0], self.edge_first[e]
+        cells.append(cur)
+        while not self.junction[cur]:
+            last, cur = cur, self._next(cur, last)[0]
+            cells.append(cur)
+        return cells
+
+    def _local(self, p):
+        """
+        Searches the cells around p up to the nearest junctions
+
+        :return: (dist, parent, exits); dist and parent cover the cells reached and
+                 exits lists the junctions through which the graph is entered
+        """
+        dist = {p: 0.0}
+        parent = {p: -1}
+        if self.junction[p]:
+            return dist, parent, [p]
+        exits = []
+        done = set()
+        queue = [(0.0, p)]
+        while queue:
+            d, x = heapq.heappop(queue)
+            if x in done:
+                continue
+            done.add(x)
+            if self.junction[x]:
+                exits.append(x)
+                continue
+            for v, step in self.grid.successors(x):
+                alt = d + step
+                if alt < dist.get(v, INFINITY):
+                    dist[v] = alt
+                    parent[v] = x
+                    heapq.heappush(queue, (alt, v))
+        return dist, parent, exits
+
+    @staticmethod
+    def _cells_from(parent, x):
+        """
+        Returns the cells from x to the origin of a local search, x excluded
+        """
+        cells = []
+        x = parent[x]
+        while x >= 0:
+            cells.append(x)
+            x = parent[x]
+        return cells
+
+    def solve(self, start, target, algorithm="A*"):
+        """
+        Searches the contracted graph from start to target
+
+        :param start:     node id of the initial position of the robot
+        :param target:    node id of the target
+        :param algorithm: "A*" or "Dijkstra"
+        :return:          a SearchResult over the cells of the grid; expanded
+                          counts the junctions that have been expanded
+        """
+        if algorithm not in ("A*", "Dijkstra"):
+            raise ValueError("unknown algorithm: {0}".format(algorithm))
+        grid = self.grid
+        if not grid.free[start] or not grid.free[target]:
+            return SearchResult(grid, start, target, new_prev(len(grid)), False, 0, INFINITY)
+        columns = grid.columns
+        scale = grid.min_cost
+        tr, tc = divmod(target, columns)
+
+        # links from start to the graph, from the graph to target and,
+        # if there is a route that avoids all junctions, from start to target
+        links = {}  # node -> [(other node, cost, cells from node (excluded) to other node)]
+        dist_s, parent_s, exits_s = self._local(start)
+        dist_t, parent_t, exits_t = self._local(target)
+        for j in exits_s:
+            if j != start:
+                cells = self._cells_from(parent_s, j)[::-1][1:] + [j]
+                links.setdefault(start, []).append((j, dist_s[j], cells))
+        for j in exits_t:
+            if j != target:
+                links.setdefault(j, []).append((target, dist_t[j], self._cells_from(parent_t, j)))
+        if target in dist_s and target != start:
+            cells = self._cells_from(parent_s, target)[::-1][1:] + [target]
+            links.setdefault(start, []).append((target, dist_s[target], cells))
+
+        def h(x):
+            if algorithm == "Dijkstra":
+                return 0.0
+            xr, xc = divmod(x, columns)
+            return scale * math.hypot(tr - xr, tc - xc)
+
+        dist = {start: 0.0}
+        parent = {}  # node -> (previous node, edge id or list of cells)
+        closed = set()
+        queue = [(h(start), 0.0, start)]
+        expanded = 0
+        found = False
+        while queue:
+            f, d, x = heapq.heappop(queue)
+            if x in closed:
+                continue
+            closed.add(x)
+            if x == target:
+                found = True
+                break
+            expanded += 1
+            out = [(self.edge_v[e], self.edge_cost[e], e) for e in self.adj.get(x, ())]
+            out.extend(links.get(x, ()))
+            for w, cost, via in out:
+                # a dead end is only worth entering if it leads to the target
+                if w != target and w not in links and len(self.adj.get(w, ())) == 1:
+                    continue
+                alt = d + cost
+                if alt < dist.get(w, INFINITY):
+                    dist[w] = alt
+                    parent[w] = (x, via)
+                    heapq.heappush(queue, (alt + h(w), alt, w))
+        prev = new_prev(len(grid))
+        if not found:
+            return SearchResult(grid, start, target, prev, False, expanded, INFINITY)
+        # expand the corridors of the route back to cells
+        x = target
+        while x != start:
+            y, via = parent[x]
+            cells = self.corridor(via)[1:] if isinstance(via, int) else via
+            last = y
+            for cell in cells:
+                prev[cell] = last
+                last = cell
+            x = y
+        return SearchResult(grid, start, target, prev, True, expanded, dist[target])
@@ -0,0 +1,258 @@
+"""
+Random perfect maze generators behind a common interface.
+
+A maze of height x width cells is drawn, as in the GUI (final.py), on a
+(2 * height + 1) x (2 * width + 1) grid: the cells are at odd rows and columns,
+everything else starts as a wall (OBST) and the passages between connected
+cells are carved out (EMPTY).
+
+Every generator yields the grid either row by row (iter_rows) or whole (grid);
+each one implements the form that suits it and inherits the other. Eller's
+algorithm produces rows as it goes in O(width) memory, so it can write mazes
+larger than the RAM straight to disk.
+"""
+import random
+
+import numpy
+
+from maze.grid import EMPTY, OBST
+
+
+class Generator(object):
+    """
+    Base class of the maze generators
+    """
+    name = None
+
+    def __init__(self, height, width, seed=None):
+        """
+        Constructor
+
+        :param height: the number of rows of cells of the maze
+        :param width:  the number of columns of cells of the maze
+        :param seed:   optional seed of the random numbers
+        """
+        if height < 1 or width < 1:
+            raise ValueError("a maze needs at least one cell")
+        self.height = height
+        self.width = width
+        self.seed = seed
+        self.rows = 2 * height + 1
+        self.columns = 2 * width + 1
+
+    def grid(self):
+        """
+        Returns the whole maze as a rows x columns uint8 array
+        """
+        return numpy.vstack(list(self.iter_rows()))
+
+    def iter_rows(self):
+        """
+        Yields the rows of the maze from the top, as uint8 arrays
+        """
+        yield from self.grid()
+
+    def walls(self):
+        """
+        Returns a grid with every wall in place and the cells carved out
+        """
+        cells = numpy.full((self.rows, self.columns), OBST, dtype=numpy.uint8)
+        cells[1::2, 1::2] = EMPTY
+        return cells
+
+
+class GrowingTree(Generator):
+    """
+    The growing tree algorithm of the GUI: mostly the newest cell is grown,
+    one time in ten a random one, to avoid long halls with short branches
+    """
+    name = "growing-tree"
+
+    def grid(self):
+        rnd = random.Random(self.seed)
+        height, width = self.height, self.width
+        cells = self.walls()
+        visited = bytearray(height * width)
+        visited[0] = 1
+        stack = [0]
+        while stack:
+            if rnd.randint(0, 9) == 0:
+                u = stack.pop(rnd.randrange(len(stack)))
+            else:
+                u = stack.pop()
+            r, c = divmod(u, width)
+            neighbors = []
+            for nr, nc in ((r, c + 1), (r + 1, c), (r, c - 1), (r - 1, c)):
+                if 0 <= nr < height and 0 <= nc < width and not visited[nr * width + nc]:
+                    neighbors.append((nr, nc))
+            if not neighbors:
+                continue
+            nr, nc = neighbors[rnd.randrange(len(neighbors))]
+            visited[nr * width + nc] = 1
+            cells[r + nr + 1, c + nc + 1] = EMPTY  # the wall between the two cells
+            stack.append(u)
+            stack.append(nr * width + nc)
+        return cells
+
+
+class Eller(Generator):
+    """
+    Eller's algorithm: builds the maze one row of cells at a time, keeping only
+    the sets of the cells of the current row
+    """
+    name = "eller"
+
+    def iter_rows(self):
+        rnd = random.Random(self.seed)
+        width = self.width
+        border = numpy.full(self.columns, OBST, dtype=numpy.uint8)
+        yield border
+        labels = list(range(width))  # the set of every cell of the current row
+        fresh = width                # the next unused set label
+        for i in range(self.height):
+            last = i == self.height - 1
+            parent = {}
+
+            def find(x):
+                while parent.get(x, x) != x:
+                    parent[x] = parent.get(parent[x], parent[x])
+                    x = parent[x]
+                return x
+
+            # join adjacent cells of different sets (all of them in the last row)
+            right = numpy.zeros(max(width - 1, 0), dtype=bool)
+            for c in range(width - 1):
+                a = find(labels[c])
+                b = find(labels[c + 1])
+                if a != b and (last or rnd.random() < 0.5):
+                    right[c] = True
+                    parent[b] = a
+            labels = [find(label) for label in labels]
+            row = numpy.full(self.columns, OBST, dtype=numpy.uint8)
+            row[1::2] = EMPTY
+            row[2:-1:2][right] = EMPTY
+            yield row
+            if last:
+                break
+            # every set goes down through at least one of its cells
+            down = numpy.zeros(width, dtype=bool)
+            members = {}
+            for c, label in enumerate(labels):
+                members.setdefault(label, []).append(c)
+            for cols in members.values():
+                down[rnd.choice(cols)] = True
+                for c in cols:
+                    if rnd.random() < 0.3:
+                        down[c] = True
+            below = numpy.full(self.columns, OBST, dtype=numpy.uint8)
+            below[1::2][down] = EMPTY
+            yield below
+            for c in range(width):
+                if not down[c]:
+                    labels[c] = fresh
+                    fresh += 1
+        yield border
+
+
+class BinaryTree(Generator):
+    """
+    Binary tree algorithm: every cell opens north or west at random,
+    built with whole-array operations
+    """
+    name = "binary-tree"
+
+    def grid(self):
+        rng = numpy.random.default_rng(self.seed)
+        cells = self.walls()
+        north = rng.random((self.height, self.width)) < 0.5
+        north[0, :] = False  # the top row can only open west...
+        north[:, 0] = True   # ... and the left column only north
+        west = ~north
+        west[0, 0] = False
+        north[0, 0] = False
+        cells[0:-1:2, 1::2][north] = EMPTY  # the wall above each cell
+        cells[1::2, 0:-1:2][west] = EMPTY   # the wall left of each cell
+        return cells
+
+
+class Sidewinder(Generator):
+    """
+    Sidewinder algorithm: every row is split in runs of cells opened east and each
+    run opens north through one of its cells, built with whole-array operations
+    """
+    name = "sidewinder"
+
+    def grid(self):
+        rng = numpy.random.default_rng(self.seed)
+        height, width = self.height, self.width
+        cells = self.walls()
+        # east[i, j]: cell (i, j) opens to cell (i, j + 1)
+        east = rng.random((height, width)) < 0.5
+        east[0, :] = True    # the top row is a single run
+        east[:, -1] = False  # runs end at the right border
+        cells[1::2, 2:-1:2][east[:, :-1]] = EMPTY
+        # each run of the other rows opens north at a random cell of it
+        ends = numpy.flatnonzero(~east[1:].ravel())
+        starts = numpy.concatenate(([0], ends[:-1] + 1))
+        chosen = starts + (rng.random(len(ends)) * (ends - starts + 1)).astype(numpy.int64)
+        r, c = numpy.divmod(chosen, width)
+        cells[2 * (r + 1), 2 * c + 1] = EMPTY
+        return cells
+
+
+class Kruskal(Generator):
+    """
+    Randomized Kruskal's algorithm: the walls are removed in random order
+    whenever they separate cells not yet connected (union-find)
+    """
+    name = "kruskal"
+
+    def grid(self):
+        rng = numpy.random.default_rng(self.seed)
+        height, width = self.height, self.width
+        cells = self.walls()
+        n = height * width
+        ids = numpy.arange(n).reshape(height, width)
+        # all walls between adjacent cells, as pairs of cell ids
+        pairs = numpy.concatenate((
+            numpy.stack((ids[:, :-1].ravel(), ids[:, 1:].ravel()), axis=1),
+            numpy.stack((ids[:-1, :].ravel(), ids[1:, :].ravel()), axis=1)))
+        pairs = pairs[rng.permutation(len(pairs))].tolist()
+        parent = list(range(n))
+        joined = 0
+        for a, b in pairs:
+            # find both roots, with path halving
+            x = a
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            y = b
+            while parent[y] != y:
+                parent[y] = parent[parent[y]]
+                y = parent[y]
+            if x == y:
+                continue
+            parent[y] = x
+            ar, ac = divmod(a, width)
+            br, bc = divmod(b, width)
+            cells[ar + br + 1, ac + bc + 1] = EMPTY  # the wall between the two cells
+            joined += 1
+            if joined == n - 1:
+                break
+        return cells
+
+
+GENERATORS = {cls.name: cls for cls in (GrowingTree, Eller, BinaryTree, Sidewinder, Kruskal)}
+
+
+def generator(name, height, width, seed=None):
+    """
+    Returns the generator registered under a name
+
+    :param name: one of the names in GENERATORS
+    """
+    try:
+        cls = GENERATORS[name]
+    except KeyError:
+        raise ValueError("unknown maze generator: {0}".format(name))
+    return cls(height, width, seed)
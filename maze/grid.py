@@ -0,0 +1,186 @@
+"""
+Headless representation of the grid used by the solvers.
+
+Cells are addressed by flat integer node ids (row * columns + col), so that
+distances, predecessors etc. can be kept in flat arrays instead of Cell objects.
+"""
+import math
+from array import array
+
+import numpy
+
+#######################################
+#                                     #
+#      Constants of the grid          #
+#                                     #
+#######################################
+EMPTY = 0       # empty cell
+OBST = 1        # cell with obstacle
+ROBOT = 2       # the position of the robot
+TARGET = 3      # the position of the target
+FRONTIER = 4    # cells that form the frontier (OPEN SET)
+CLOSED = 5      # cells that form the CLOSED SET
+ROUTE = 6       # cells that form the robot-to-target path
+
+SQRT2 = math.sqrt(2)
+
+# the (row, col) offsets of the eight moves, in the order they are
+# examined by Grid.successors (up, up-right, right, ... , up-left)
+MOVES = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+class Grid(object):
+    """
+    A rows x columns grid of cell values (EMPTY, OBST, ...), optionally with
+    a plane of terrain costs.
+
+    Without costs a move costs its Euclidean length (1 or sqrt(2)). With
+    costs, a move between two cells costs its length times the mean of the
+    costs of the two cells, which keeps moves symmetric.
+    """
+
+    def __init__(self, cells, costs=None):
+        """
+        Constructor
+
+        :param cells: 2d array-like of cell values, row 0 is the top
+        :param costs: optional 2d array-like (e.g. uint8 or float32) of the
+                      traversal cost of every cell, of the same shape as cells
+        """
+        self.cells = numpy.array(cells, dtype=numpy.uint8)
+        self.rows, self.columns = self.cells.shape
+        # flat passability table; a bytearray is much cheaper to index
+        # from Python code than the numpy array itself
+        self.free = bytearray((self.cells != OBST).ravel().tobytes())
+        # callbacks watcher(node, old value, new value) invoked by set()
+        self.watchers = []
+        self.costs = None
+        self.min_cost = 1.0  # at most the lowest cost of a free cell, used to scale heuristics
+        if costs is not None:
+            self.set_costs(costs)
+
+    def set_costs(self, costs):
+        """
+        Attaches a plane of terrain costs to the grid
+
+        :param costs: 2d array-like of non-negative costs, None to remove the costs
+        """
+        if costs is None:
+            self.costs = None
+            self.min_cost = 1.0
+            self.__dict__.pop('successors', None)
+            return
+        costs = numpy.asarray(costs)
+        if costs.shape != self.cells.shape:
+            raise ValueError("the cost plane must be {0}x{1}".format(self.rows, self.columns))
+        if (costs < 0).any():
+            raise ValueError("terrain costs must not be negative")
+        self.costs = costs
+        free = self.cells != OBST
+        self.min_cost = float(costs[free].min()) if free.any() else 1.0
+        # half of every cost as a flat array of doubles, converted once
+        self.half_cost = array('d', (costs.astype(numpy.float64) * 0.5).ravel().tobytes())
+        # the weighted moves replace the plain ones for this grid only,
+        # so the unweighted grids keep the fast path
+        self.successors = self._weighted_successors
+
+    def __len__(self):
+        return self.rows * self.columns
+
+    def new_table(self, typecode, value):
+        """
+        Returns a flat table with an entry per node, every entry set to value;
+        the solvers keep their distances, predecessors etc. in such tables
+
+        :param typecode: the array typecode of the entries ('d', 'q', 'B', ...)
+        """
+        return array(typecode, [value]) * len(self)
+
+    def node(self, row, col):
+        """
+        Returns the node id of the cell at (row, col)
+        """
+        return row * self.columns + col
+
+    def coords(self, node):
+        """
+        Returns the (row, col) of a node id
+        """
+        return divmod(node, self.columns)
+
+    def get(self, row, col):
+        return int(self.cells[row, col])
+
+    def set(self, row, col, value):
+        """
+        Changes the value of a cell, keeping the passability table in sync
+        and notifying the watchers
+        """
+        node = row * self.columns + col
+        old = int(self.cells[row, col])
+        self.cells[row, col] = value
+        self.free[node] = value != OBST
+        if self.costs is not None and value != OBST:
+            # a cheaper cell may have been freed: the heuristics must not overestimate
+            self.min_cost = min(self.min_cost, float(self.costs[row, col]))
+        for watcher in self.watchers:
+            watcher(node, old, value)
+
+    def successors(self, u):
+        """
+        Returns the (node, step cost) pairs reachable from node u.
+
+        The neighbours are examined clockwise from the top (up, up-right, right,
+        down-right, down, down-left, left, up-left), the order of the GUI, and a
+        diagonal move is allowed only if one of the two cells it passes by is free.
+        """
+        cols = self.columns
+        free = self.free
+        r, c = divmod(u, cols)
+        up = r > 0 and free[u - cols]
+        down = r < self.rows - 1 and free[u + cols]
+        left = c > 0 and free[u - 1]
+        right = c < cols - 1 and free[u + 1]
+        temp = []
+        if up:
+            temp.append((u - cols, 1.0))
+        if r > 0 and c < cols - 1 and free[u - cols + 1] and (up or right):
+            temp.append((u - cols + 1, SQRT2))
+        if right:
+            temp.append((u + 1, 1.0))
+        if r < self.rows - 1 and c < cols - 1 and free[u + cols + 1] and (down or right):
+            temp.append((u + cols + 1, SQRT2))
+        if down:
+            temp.append((u + cols, 1.0))
+        if r < self.rows - 1 and c > 0 and free[u + cols - 1] and (down or left):
+            temp.append((u + cols - 1, SQRT2))
+        if left:
+            temp.append((u - 1, 1.0))
+        if r > 0 and c > 0 and free[u - cols - 1] and (up or left):
+            temp.append((u - cols - 1, SQRT2))
+        return temp
+
+    def _weighted_successors(self, u):
+        """
+        Grid.successors() with the step costs scaled by the terrain costs
+        """
+        half = self.half_cost
+        hu = half[u]
+        return [(v, step * (hu + half[v])) for v, step in Grid.successors(self, u)]
+
+    def cost_between(self, u, v):
+        """
+        Returns the cost of the move between two adjacent cells
+        """
+        length = self.dist_between(u, v)
+        if self.costs is None:
+            return length
+        return length * (self.half_cost[u] + self.half_cost[v])
+
+    def dist_between(self, u, v):
+        """
+        Euclidean distance between the centres of two cells
+        """
+        ur, uc = divmod(u, self.columns)
+        vr, vc = divmod(v, self.columns)
+        return math.hypot(ur - vr, uc - vc)
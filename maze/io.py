@@ -0,0 +1,97 @@
+"""
+Reading and writing of .maze files.
+
+A .maze file is plain text with one line per row of the grid:
+
+    X  obstacle (also '#')
+    .  empty cell (also ' ')
+    S  the initial position of the robot
+    T  the target
+"""
+import numpy
+
+from maze.grid import Grid, EMPTY, OBST
+
+WALL_CHARS = "X#"
+EMPTY_CHARS = ". "
+
+# byte translation of a row of cell values to .maze characters
+_ROW_CHARS = bytes.maketrans(bytes(range(7)), b".X.....")
+
+
+def parse_maze(lines):
+    """
+    Builds a grid from the lines of a .maze file
+
+    :return: (grid, start, target); start and target are node ids or None if missing
+    """
+    rows = [line.rstrip("\r\n") for line in lines]
+    while rows and not rows[-1]:
+        rows.pop()
+    if not rows:
+        raise ValueError("empty maze")
+    columns = max(len(row) for row in rows)
+    cells = numpy.full((len(rows), columns), EMPTY, dtype=numpy.uint8)
+    start = target = None
+    for r, row in enumerate(rows):
+        for c, ch in enumerate(row):
+            if ch in WALL_CHARS:
+                cells[r, c] = OBST
+            elif ch == "S":
+                start = r * columns + c
+            elif ch == "T":
+                target = r * columns + c
+            elif ch not in EMPTY_CHARS:
+                raise ValueError("unexpected character {0!r} at row {1}, column {2}".format(ch, r, c))
+    return Grid(cells), start, target
+
+
+def load_maze(path):
+    """
+    Reads a .maze file
+
+    :return: (grid, start, target) as parse_maze()
+    """
+    with open(path) as fp:
+        return parse_maze(fp)
+
+
+def format_maze(grid, start=None, target=None):
+    """
+    Returns the lines of the .maze representation of a grid
+    """
+    chars = numpy.where(grid.cells == OBST, "X", ".")
+    for node, ch in ((start, "S"), (target, "T")):
+        if node is not None:
+            chars[divmod(node, grid.columns)] = ch
+    return ["".join(row) for row in chars]
+
+
+def save_maze(path, grid, start=None, target=None):
+    """
+    Writes a grid to a .maze file
+    """
+    with open(path, "w") as fp:
+        for line in format_maze(grid, start, target):
+            fp.write(line + "\n")
+
+
+def write_rows(fp, rows, start=None, target=None):
+    """
+    Writes grid rows to a text file object as they come, so that a maze streamed
+    by a generator never has to be in memory as a whole
+
+    :param rows:   iterable of 1d arrays of cell values
+    :param start:  optional (row, col) of the robot
+    :param target: optional (row, col) of the target
+    :return:       the number of rows written
+    """
+    count = 0
+    for r, row in enumerate(rows):
+        line = numpy.asarray(row, dtype=numpy.uint8).tobytes().translate(_ROW_CHARS)
+        for cell, ch in ((start, b"S"), (target, b"T")):
+            if cell is not None and cell[0] == r:
+                line = line[:cell[1]] + ch + line[cell[1] + 1:]
+        fp.write(line.decode("ascii") + "\n")
+        count += 1
+    return count
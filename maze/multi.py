@@ -0,0 +1,164 @@
+"""
+Searches with many robots and many targets (docks) on the same grid.
+
+Instead of one search per robot/dock pair:
+
+- nearest_target() runs one search from a robot that stops at the first dock
+  settled, which is the nearest one;
+- multi_source_dijkstra() runs one Dijkstra from all docks at once and labels
+  every reachable cell with its closest dock. Since moves are symmetric, the
+  predecessor of a cell points one step closer to that dock, so the route of
+  any robot is read by walking forward from the robot.
+"""
+import heapq
+import math
+
+from maze.solver import SearchResult, INFINITY
+
+
+def nearest_target(grid, start, targets, algorithm="A*"):
+    """
+    Finds the route from start to the nearest of several targets in a single search
+
+    :param targets:   node ids of the targets
+    :param algorithm: "A*" (heuristic: distance to the closest target) or "Dijkstra"
+    :return:          a SearchResult whose target is the target reached
+    """
+    if algorithm not in ("A*", "Dijkstra"):
+        raise ValueError("unknown algorithm: {0}".format(algorithm))
+    columns = grid.columns
+    goals = set(t for t in targets if grid.free[t])
+    dist = grid.new_table('d', INFINITY)
+    prev = grid.new_table('q', -1)
+    closed = grid.new_table('B', 0)
+    if not goals or not grid.free[start]:
+        return SearchResult(grid, start, None, prev, False, 0, INFINITY, closed)
+    scale = grid.min_cost
+    points = [divmod(t, columns) for t in goals]
+
+    def h(v):
+        if algorithm == "Dijkstra":
+            return 0.0
+        vr, vc = divmod(v, columns)
+        return scale * min(math.hypot(tr - vr, tc - vc) for tr, tc in points)
+
+    dist[start] = 0.0
+    queue = [(h(start), start)]
+    expanded = 0
+    while queue:
+        f, u = heapq.heappop(queue)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        if u in goals:
+            return SearchResult(grid, start, u, prev, True, expanded, dist[u], closed)
+        expanded += 1
+        du = dist[u]
+        for v, step in grid.successors(u):
+            alt = du + step
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(queue, (alt + h(v), v))
+    return SearchResult(grid, start, None, prev, False, expanded, INFINITY, closed)
+
+
+class NearestMap(object):
+    """
+    The result of multi_source_dijkstra(): the closest source of every cell
+    """
+
+    def __init__(self, grid, sources, label, dist, nxt, expanded):
+        self.grid = grid
+        self.sources = sources    # the node ids of the sources, in the order given
+        self.label = label        # label[v] is the index of the source closest to v, -1 if none
+        self.dist = dist          # dist[v] is the distance from v to that source
+        self.next = nxt           # next[v] is the next cell from v towards that source
+        self.expanded = expanded  # the number of nodes that have been expanded
+
+    def nearest(self, node):
+        """
+        Returns the (source index, distance) closest to a node, (-1, INFINITY) if none
+        """
+        return self.label[node], self.dist[node]
+
+    def iter_nodes(self, node):
+        """
+        Yields the node ids of the route from node to its closest source
+        """
+        if self.label[node] < 0:
+            return
+        while node >= 0:
+            yield node
+            node = self.next[node]
+
+    def iter_route(self, node):
+        """
+        Yields the (row, col) of the route from node to its closest source
+        """
+        columns = self.grid.columns
+        for v in self.iter_nodes(node):
+            yield divmod(v, columns)
+
+    def result(self, node):
+        """
+        Returns the route from node to its closest source as a SearchResult
+        """
+        grid = self.grid
+        prev = grid.new_table('q', -1)
+        label, cost = self.nearest(node)
+        if label < 0:
+            return SearchResult(grid, node, None, prev, False, 0, INFINITY)
+        last = node
+        for v in self.iter_nodes(node):
+            if v != node:
+                prev[v] = last
+            last = v
+        return SearchResult(grid, node, self.sources[label], prev, True, 0, cost)
+
+
+def multi_source_dijkstra(grid, sources):
+    """
+    Dijkstra's algorithm from all sources at once
+
+    :param sources: node ids, e.g. of the docks
+    :return:        a NearestMap labelling every reachable cell with its closest source
+    """
+    dist = grid.new_table('d', INFINITY)
+    label = grid.new_table('q', -1)
+    nxt = grid.new_table('q', -1)
+    closed = grid.new_table('B', 0)
+    queue = []
+    for i, s in enumerate(sources):
+        if grid.free[s] and dist[s] > 0.0:
+            dist[s] = 0.0
+            label[s] = i
+            queue.append((0.0, s))
+    heapq.heapify(queue)
+    expanded = 0
+    while queue:
+        d, u = heapq.heappop(queue)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        expanded += 1
+        lu = label[u]
+        for v, step in grid.successors(u):
+            alt = d + step
+            if alt < dist[v]:
+                dist[v] = alt
+                label[v] = lu
+                nxt[v] = u
+                heapq.heappush(queue, (alt, v))
+    return NearestMap(grid, list(sources), label, dist, nxt, expanded)
+
+
+def assign(grid, robots, docks):
+    """
+    Sends every robot to its closest dock with a single multi-source search
+
+    :return: list of (robot, dock index, distance) in the order of robots;
+             the dock index is -1 for robots that cannot reach any dock
+    """
+    nearest = multi_source_dijkstra(grid, docks)
+    return [(robot,) + tuple(nearest.nearest(robot)) for robot in robots]
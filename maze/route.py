@@ -0,0 +1,84 @@
+"""
+Lazy extraction of robot-to-target routes from predecessor arrays.
+
+A route is stored backwards (each cell points to its predecessor), so yielding it
+from start to target needs some buffering. Instead of materializing the whole
+route, iter_route() remembers only every chunk_size-th cell while walking from
+the target to the start and then replays the chunks in reverse, which keeps the
+extra memory at O(steps / chunk_size + chunk_size).
+"""
+import math
+
+CHUNK_SIZE = 4096  # the default number of cells buffered at a time
+
+
+def iter_route(prev, start, target, chunk_size=CHUNK_SIZE):
+    """
+    Yields the nodes of the route from start to target
+
+    :param prev:       sequence where prev[v] is the predecessor of node v (-1 if none)
+    :param start:      the first node of the route
+    :param target:     the last node of the route
+    :param chunk_size: the number of nodes buffered at a time
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    # 1st pass: walk back from the target and keep every chunk_size-th node
+    marks = []
+    node = target
+    steps = 0
+    while True:
+        if steps % chunk_size == 0:
+            marks.append(node)
+        if node == start:
+            break
+        node = prev[node]
+        steps += 1
+        if node < 0:
+            raise ValueError("the target is not connected to the start")
+    # 2nd pass: expand the chunks, the one nearest to the start first
+    for mark in reversed(marks):
+        chunk = [mark]
+        node = mark
+        while node != start and len(chunk) < chunk_size:
+            node = prev[node]
+            chunk.append(node)
+        chunk.reverse()
+        yield from chunk
+
+
+def write_route(fp, cells, chunk_size=CHUNK_SIZE):
+    """
+    Writes (row, col) pairs to a text file object, one "row col" line per cell,
+    issuing a single write() per chunk_size cells
+
+    :return: the number of cells written
+    """
+    count = 0
+    lines = []
+    for row, col in cells:
+        lines.append("{0} {1}\n".format(row, col))
+        if len(lines) == chunk_size:
+            fp.write("".join(lines))
+            count += len(lines)
+            lines = []
+    if lines:
+        fp.write("".join(lines))
+        count += len(lines)
+    return count
+
+
+def route_stats(cells):
+    """
+    Returns the (steps, distance) of a route given as (row, col) pairs,
+    with the same meaning as the message shown by Maze.plot_route
+    """
+    steps = 0
+    distance = 0.0
+    last = None
+    for row, col in cells:
+        if last is not None:
+            steps += 1
+            distance += math.hypot(row - last[0], col - last[1])
+        last = (row, col)
+    return steps, distance
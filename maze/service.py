@@ -0,0 +1,254 @@
+"""
+Local solve service: python -m maze serve FILE.maze ... [--port N | --socket PATH]
+
+The clients send one JSON object per line:
+
+    {"id": 7, "maze": "office", "start": [38, 1], "target": [1, 62],
+     "algorithm": "A*", "route": false}
+
+where maze is the name of one of the preloaded mazes (the name of its file
+without the extension). The server answers one JSON line per request as soon
+as it is solved, so the answers of a connection may come back in any order:
+
+    {"id": 7, "found": true, "expanded": 812, "steps": 97, "distance": 110.812}
+
+with the segments of the route ([row, col, direction, length] lists) if route
+was true, or {"id": 7, "error": "..."} for a bad request.
+
+Concurrent requests, from any connection, are coalesced into batches of up to
+batch_size requests or batch_delay seconds. Every worker process keeps its own
+maze.cache.SolveCache, and the requests of a batch are split among the workers
+by maze and robot position, always to the same worker, so repeated queries and
+Dijkstra queries from the same robot are answered from the cache and shortest
+path trees of that worker.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_SIZE = 64      # the most requests in a batch
+BATCH_DELAY = 0.002  # seconds a batch waits for more requests
+
+# the state of a worker process, set by _init_worker()
+_mazes = {}
+_cache = None
+
+
+def maze_name(path):
+    """
+    Returns the name under which a maze file is served
+    """
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _init_worker(cells):
+    global _cache
+    from maze.cache import SolveCache
+    from maze.grid import Grid
+
+    for name, array in cells.items():
+        _mazes[name] = Grid(array)
+    _cache = SolveCache()
+
+
+def answer(mazes, cache, query):
+    """
+    Solves a single request
+
+    :param mazes: dict of the grids by name
+    :param cache: the maze.cache.SolveCache of the worker
+    :return:      the response, as a dict
+    """
+    from maze.solver import NodeLimitExceeded
+
+    response = {"id": query.get("id")}
+    try:
+        name = query.get("maze")
+        algorithm = query.get("algorithm", "A*")
+        if not isinstance(name, str) or not isinstance(algorithm, str):
+            raise TypeError("maze and algorithm must be strings")
+        grid = mazes.get(name)
+        if grid is None:
+            raise ValueError("unknown maze: {0}".format(name))
+        nodes = []
+        for key in ("start", "target"):
+            row, col = query[key]
+            if not (0 <= row < grid.rows and 0 <= col < grid.columns):
+                raise ValueError("{0} is outside the maze".format(key))
+            nodes.append(grid.node(row, col))
+        result = cache.solve(grid, nodes[0], nodes[1], algorithm)
+    except KeyError as error:
+        response["error"] = "missing {0}".format(error)
+        return response
+    except (TypeError, ValueError, NodeLimitExceeded) as error:
+        response["error"] = str(error)
+        return response
+    response["found"] = result.found
+    response["expanded"] = result.expanded
+    if result.found:
+        response["steps"], response["distance"] = result.stats()
+        if query.get("route"):
+            response["segments"] = [[row, col, direction, length]
+                                    for (row, col), direction, length in result.segments()]
+    return response
+
+
+def solve_batch(queries):
+    """
+    Solves a batch of requests in a worker process
+
+    :return: the responses, in the order of the queries
+    """
+    responses = []
+    for query in queries:
+        try:
+            responses.append(answer(_mazes, _cache, query))
+        except Exception as error:
+            # an unexpected failure only fails its own request, not the batch
+            responses.append({"id": query.get("id"), "error": str(error)})
+    return responses
+
+
+class SolveServer(object):
+    """
+    asyncio server dispatching batches of solve requests to a pool of worker processes
+    """
+
+    def __init__(self, mazes, workers=None, batch_size=BATCH_SIZE, batch_delay=BATCH_DELAY):
+        """
+        Constructor
+
+        :param mazes:       dict of the maze.grid.Grid to serve, by name
+        :param workers:     the number of worker processes, the number of CPUs by default
+        :param batch_size:  the most requests in a batch
+        :param batch_delay: seconds a batch waits for more requests
+        """
+        self.mazes = mazes
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        cells = {name: grid.cells for name, grid in mazes.items()}
+        # a pool of one process per worker, so that a request can be sent to a given worker
+        self.pools = [ProcessPoolExecutor(1, initializer=_init_worker, initargs=(cells,))
+                      for _ in range(self.workers)]
+        self.pending = None    # queue of (query, future) waiting for a batch
+        self.server = None
+        self._dispatcher = None
+        self._running = set()  # the batches being solved
+        self._clients = {}     # the tasks serving the connections, by writer
+        self.batches = 0       # the number of batches dispatched
+        self.served = 0        # the number of requests answered
+
+    async def start(self, host=HOST, port=PORT, path=None):
+        """
+        Starts listening on a Unix socket if path is given, else on host:port
+        """
+        self.pending = asyncio.Queue()
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._client, path)
+        else:
+            self.server = await asyncio.start_server(self._client, host, port)
+        return self.server
+
+    async def close(self):
+        """
+        Stops listening and shuts the worker pool down
+        """
+        if self.server is not None:
+            self.server.close()
+            # end the connections still open, as if the clients had hung up
+            for writer in self._clients:
+                writer.transport.abort()
+            await asyncio.gather(*self._clients.values(), return_exceptions=True)
+            await self.server.wait_closed()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        for pool in self.pools:
+            pool.shutdown()
+
+    async def _client(self, reader, writer):
+        lock = asyncio.Lock()
+        replies = []
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                future = asyncio.get_event_loop().create_future()
+                try:
+                    query = json.loads(line)
+                    if not isinstance(query, dict):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as error:
+                    future.set_result({"id": None, "error": str(error)})
+                else:
+                    await self.pending.put((query, future))
+                replies.append(asyncio.ensure_future(self._reply(future, writer, lock)))
+            await asyncio.gather(*replies)
+        except ConnectionError:
+            pass
+        finally:
+            del self._clients[writer]
+            writer.close()
+
+    async def _reply(self, future, writer, lock):
+        response = await future
+        async with lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        self.served += 1
+
+    async def _dispatch(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            # the requests of the same robot go to the same worker
+            shares = {}
+            for item in batch:
+                query = item[0]
+                worker = hash((str(query.get("maze")), str(query.get("start")))) % self.workers
+                shares.setdefault(worker, []).append(item)
+            for worker, share in shares.items():
+                task = asyncio.ensure_future(self._run(self.pools[worker], share))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, pool, batch):
+        queries = [query for query, future in batch]
+        try:
+            responses = await asyncio.get_event_loop().run_in_executor(pool, solve_batch, queries)
+        except Exception as error:
+            responses = [{"id": query.get("id"), "error": str(error)} for query in queries]
+        for (query, future), response in zip(batch, responses):
+            if not future.done():
+                future.set_result(response)
+
+
+async def serve(paths, host=HOST, port=PORT, path=None, **options):
+    """
+    Serves the given .maze files until cancelled
+    """
+    from maze.io import load_maze
+
+    mazes = {maze_name(p): load_maze(p)[0] for p in paths}
+    server = SolveServer(mazes, **options)
+    await server.start(host, port, path)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
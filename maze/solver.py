@@ -0,0 +1,467 @@
+"""
+Headless A*, Dijkstra, Theta* and frontier A* solvers working on a maze.grid.Grid.
+"""
+import heapq
+import math
+from array import array
+
+from maze import anyangle, compress, route
+from maze.tiled import SparseTable
+
+INFINITY = math.inf
+MAX_NODES = 1000000  # the default memory ceiling of frontier_astar(), in open nodes
+
+
+class NodeLimitExceeded(Exception):
+    """
+    Raised by a memory-bounded search that needs more nodes than its ceiling
+    """
+
+
+class SearchResult(object):
+    """
+    The outcome of a search: the predecessor array and some statistics
+    """
+
+    def __init__(self, grid, start, target, prev, found, expanded, cost, closed=None, any_angle=False):
+        self.grid = grid
+        self.start = start        # node id of the robot
+        self.target = target      # node id of the target
+        self.prev = prev          # prev[v] is the predecessor of v, -1 if none
+        self.found = found        # flag that the target was reached
+        self.expanded = expanded  # the number of nodes that have been expanded
+        self.cost = cost          # the length of the route, INFINITY if not found
+        self.closed = closed      # closed[v] is 1 for the expanded nodes, if recorded
+        # flag that prev links waypoints in line of sight rather than adjacent cells
+        self.any_angle = any_angle
+
+    def iter_waypoints(self, chunk_size=route.CHUNK_SIZE):
+        """
+        Yields the node ids linked by the predecessor array, from start to target:
+        the cells of the route, or its waypoints for an any-angle route
+        """
+        if not self.found:
+            return iter(())
+        return route.iter_route(self.prev, self.start, self.target, chunk_size)
+
+    def iter_nodes(self, chunk_size=route.CHUNK_SIZE):
+        """
+        Yields the node ids of the cells of the route lazily, from start to target
+        """
+        if self.any_angle:
+            return anyangle.iter_cells(self.iter_waypoints(chunk_size), self.grid.columns)
+        return self.iter_waypoints(chunk_size)
+
+    def iter_route(self, chunk_size=route.CHUNK_SIZE):
+        """
+        Yields the (row, col) of the cells of the route lazily, from start to target
+        """
+        columns = self.grid.columns
+        for node in self.iter_nodes(chunk_size):
+            yield divmod(node, columns)
+
+    def write_route(self, fp, chunk_size=route.CHUNK_SIZE):
+        """
+        Writes the route to a text file object, one "row col" line per cell
+
+        :return: the number of cells written
+        """
+        return route.write_route(fp, self.iter_route(chunk_size), chunk_size)
+
+    def stats(self):
+        """
+        Returns the (steps, distance) of the route, as reported by Maze.plot_route;
+        the distance of an any-angle route is the length of its segments
+        """
+        steps, distance = route.route_stats(self.iter_route())
+        if self.any_angle:
+            distance = anyangle.path_length(self.iter_waypoints(), self.grid.columns)
+        return steps, distance
+
+    def smoothed(self):
+        """
+        Returns the route shortened by path smoothing, as an any-angle SearchResult
+
+        :raise ValueError: if the grid has terrain costs, as the segments are
+                           measured by their length
+        """
+        if self.grid.costs is not None:
+            raise ValueError("any-angle searches need a grid without terrain costs")
+        if not self.found:
+            return self
+        grid = self.grid
+        waypoints = anyangle.smooth(grid, self.iter_nodes())
+        prev = grid.new_table('q', -1)
+        for u, v in zip(waypoints, waypoints[1:]):
+            prev[v] = u
+        return SearchResult(grid, self.start, self.target, prev, True, self.expanded,
+                            anyangle.path_length(waypoints, grid.columns), self.closed, True)
+
+    def segments(self):
+        """
+        Returns the route compressed to ((row, col), direction, length) segments
+        """
+        return compress.segments(self.iter_route())
+
+
+def new_prev(size):
+    """
+    Returns a predecessor array of the given size with every entry undefined
+    """
+    return array('q', [-1]) * size
+
+
+def astar(grid, start, target):
+    """
+    A* search from start to target with the Euclidean distance, scaled by the
+    lowest terrain cost, as heuristic
+
+    :param grid:   the maze.grid.Grid to search
+    :param start:  node id of the initial position of the robot
+    :param target: node id of the target
+    :return:       a SearchResult
+    """
+    columns = grid.columns
+    scale = grid.min_cost
+    tr, tc = divmod(target, columns)
+    g = grid.new_table('d', INFINITY)
+    prev = grid.new_table('q', -1)
+    if not grid.free[start] or not grid.free[target]:
+        return SearchResult(grid, start, target, prev, False, 0, INFINITY)
+    closed = grid.new_table('B', 0)
+    g[start] = 0.0
+    sr, sc = divmod(start, columns)
+    open_set = [(scale * math.hypot(tr - sr, tc - sc), start)]
+    expanded = 0
+    while open_set:
+        f, u = heapq.heappop(open_set)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        if u == target:
+            return SearchResult(grid, start, target, prev, True, expanded, g[u], closed)
+        expanded += 1
+        gu = g[u]
+        for v, step in grid.successors(u):
+            alt = gu + step
+            if alt < g[v]:
+                g[v] = alt
+                prev[v] = u
+                vr, vc = divmod(v, columns)
+                heapq.heappush(open_set, (alt + scale * math.hypot(tr - vr, tc - vc), v))
+    return SearchResult(grid, start, target, prev, False, expanded, INFINITY, closed)
+
+
+def dijkstra(grid, start, target):
+    """
+    Dijkstra's algorithm from start, stopping as soon as target is settled
+
+    :param grid:   the maze.grid.Grid to search
+    :param start:  node id of the initial position of the robot
+    :param target: node id of the target
+    :return:       a SearchResult
+    """
+    dist = grid.new_table('d', INFINITY)
+    prev = grid.new_table('q', -1)
+    if not grid.free[start] or not grid.free[target]:
+        return SearchResult(grid, start, target, prev, False, 0, INFINITY)
+    closed = grid.new_table('B', 0)
+    dist[start] = 0.0
+    queue = [(0.0, start)]
+    expanded = 0
+    while queue:
+        d, u = heapq.heappop(queue)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        if u == target:
+            return SearchResult(grid, start, target, prev, True, expanded, d, closed)
+        expanded += 1
+        for v, step in grid.successors(u):
+            alt = d + step
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(queue, (alt, v))
+    return SearchResult(grid, start, target, prev, False, expanded, INFINITY, closed)
+
+
+class ShortestPathTree(object):
+    """
+    Dijkstra's algorithm from a single source, kept alive between queries.
+
+    The distances and predecessors settled for one target stay valid for every
+    other target as long as the grid does not change, so a target that has
+    already been settled is answered by walking the predecessor array without
+    any expansion, and the search is resumed only for targets not settled yet.
+    """
+
+    def __init__(self, grid, source):
+        """
+        Constructor
+
+        :param grid:   the maze.grid.Grid to search; it must not change while the tree is used
+        :param source: node id of the initial position of the robot
+        """
+        self.grid = grid
+        self.source = source
+        self.dist = grid.new_table('d', INFINITY)
+        self.prev = grid.new_table('q', -1)
+        self.closed = grid.new_table('B', 0)
+        self.queue = []      # the frontier of the search, to resume it later
+        self.pending = None  # the last target settled, expanded when the search resumes
+        self.expanded = 0    # the number of nodes expanded so far
+        if grid.free[source]:
+            self.dist[source] = 0.0
+            self.queue.append((0.0, source))
+
+    def complete(self):
+        """
+        Returns True when every node reachable from the source has been settled
+        """
+        return not self.queue and self.pending is None
+
+    def grow(self, target=None):
+        """
+        Resumes the search until target is settled, or until all reachable nodes
+        are settled if target is None
+        """
+        dist = self.dist
+        prev = self.prev
+        closed = self.closed
+        queue = self.queue
+        successors = self.grid.successors
+        u = self.pending
+        self.pending = None
+        while u is not None or queue:
+            if u is None:
+                d, u = heapq.heappop(queue)
+                if closed[u]:
+                    u = None
+                    continue
+                closed[u] = 1
+                if u == target:
+                    # settled but not expanded, as in dijkstra()
+                    self.pending = u
+                    return
+            self.expanded += 1
+            d = dist[u]
+            for v, step in successors(u):
+                alt = d + step
+                if alt < dist[v]:
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(queue, (alt, v))
+            u = None
+
+    def query(self, target):
+        """
+        Returns the SearchResult from the source to target; expanded counts
+        only the nodes expanded by this query
+        """
+        before = self.expanded
+        if self.grid.free[target] and not self.closed[target]:
+            self.grow(target)
+        if not self.closed[target]:
+            return SearchResult(self.grid, self.source, target, self.prev, False,
+                                self.expanded - before, INFINITY, self.closed)
+        return SearchResult(self.grid, self.source, target, self.prev, True,
+                            self.expanded - before, self.dist[target], self.closed)
+
+
+def theta_star(grid, start, target, lazy=False):
+    """
+    Theta* search from start to target: like A*, but a node reached from u links
+    to the predecessor of u whenever it is in line of sight, which gives
+    any-angle routes
+
+    :param grid:   the maze.grid.Grid to search, without terrain costs
+    :param start:  node id of the initial position of the robot
+    :param target: node id of the target
+    :param lazy:   Lazy Theta*: the line of sight is assumed when a node is reached
+                   and checked once, when the node is expanded
+    :return:       an any-angle SearchResult
+    """
+    if grid.costs is not None:
+        raise ValueError("any-angle searches need a grid without terrain costs")
+    columns = grid.columns
+    tr, tc = divmod(target, columns)
+    g = grid.new_table('d', INFINITY)
+    prev = grid.new_table('q', -1)
+    if not grid.free[start] or not grid.free[target]:
+        return SearchResult(grid, start, target, prev, False, 0, INFINITY, None, True)
+    closed = grid.new_table('B', 0)
+    dist_between = grid.dist_between
+    line_of_sight = anyangle.line_of_sight
+    g[start] = 0.0
+    sr, sc = divmod(start, columns)
+    open_set = [(math.hypot(tr - sr, tc - sc), start)]
+    expanded = 0
+    while open_set:
+        f, u = heapq.heappop(open_set)
+        if closed[u]:
+            continue
+        p = prev[u]
+        if lazy and p >= 0 and not line_of_sight(grid, p, u):
+            # the predecessor assumed is hidden: link u to its best expanded neighbour,
+            # there is one since u was reached by expanding a neighbour
+            g[u] = INFINITY
+            for w, step in grid.successors(u):
+                if closed[w] and g[w] + step < g[u]:
+                    g[u] = g[w] + step
+                    prev[u] = w
+        closed[u] = 1
+        if u == target:
+            return SearchResult(grid, start, target, prev, True, expanded, g[u], closed, True)
+        expanded += 1
+        gu = g[u]
+        p = prev[u]
+        for v, step in grid.successors(u):
+            if closed[v]:
+                continue
+            parent = u
+            alt = gu + step
+            if p >= 0:
+                # the segment from p can only be shorter than the move from u,
+                # so the line of sight is checked only when it is an improvement
+                through = g[p] + dist_between(p, v)
+                if through >= g[v]:
+                    continue
+                if lazy or line_of_sight(grid, p, v):
+                    parent = p
+                    alt = through
+            if alt < g[v]:
+                g[v] = alt
+                prev[v] = parent
+                vr, vc = divmod(v, columns)
+                heapq.heappush(open_set, (alt + math.hypot(tr - vr, tc - vc), v))
+    return SearchResult(grid, start, target, prev, False, expanded, INFINITY, closed, True)
+
+
+def lazy_theta_star(grid, start, target):
+    """
+    Lazy Theta* search from start to target, see theta_star()
+    """
+    return theta_star(grid, start, target, lazy=True)
+
+
+def _frontier_search(grid, start, target, middle, max_nodes):
+    """
+    A* search from start to target keeping only its open list. Every open node
+    records its neighbours already expanded, which it must not generate again:
+    the moves of the grid go both ways, so an expanded node is never reached
+    again and can be forgotten. Every open node also records the edge of its
+    route where g reaches middle, so that the route can be found again by
+    solving the two halves.
+
+    :return: (cost, (u, g[u], v, g[v]) the edge where g reaches middle, expanded);
+             cost is INFINITY if the target is not reachable
+    """
+    columns = grid.columns
+    scale = grid.min_cost
+    tr, tc = divmod(target, columns)
+    sr, sc = divmod(start, columns)
+    f = scale * math.hypot(tr - sr, tc - sc)
+    # node -> [f, g, the expanded neighbours, the middle edge of its route]
+    open_nodes = {start: [f, 0.0, set(), None]}
+    open_set = [(f, start)]
+    expanded = 0
+    while open_set:
+        f, u = heapq.heappop(open_set)
+        record = open_nodes.get(u)
+        if record is None or record[0] != f:
+            continue
+        del open_nodes[u]
+        gu, done, edge = record[1:]
+        if u == target:
+            return gu, edge, expanded
+        expanded += 1
+        for v, step in grid.successors(u):
+            if v in done:
+                continue
+            record = open_nodes.get(v)
+            if record is None:
+                record = open_nodes[v] = [INFINITY, INFINITY, set(), None]
+            record[2].add(u)
+            alt = gu + step
+            if alt < record[1]:
+                vr, vc = divmod(v, columns)
+                record[0] = alt + scale * math.hypot(tr - vr, tc - vc)
+                record[1] = alt
+                if edge is None and alt >= middle:
+                    record[3] = (u, gu, v, alt)
+                else:
+                    record[3] = edge
+                heapq.heappush(open_set, (record[0], v))
+        if len(open_nodes) > max_nodes:
+            raise NodeLimitExceeded("the search needs more than {0} open nodes".format(max_nodes))
+        if len(open_set) > 2 * len(open_nodes):
+            # drop the stale entries
+            open_set = [(record[0], v) for v, record in open_nodes.items()]
+            heapq.heapify(open_set)
+    return INFINITY, None, expanded
+
+
+def frontier_astar(grid, start, target, max_nodes=MAX_NODES):
+    """
+    Memory-bounded A* search from start to target (divide and conquer frontier
+    search): the search keeps its open list only, with at most max_nodes nodes,
+    and finds the cost of the route and its middle edge. The route is then
+    rebuilt by solving the parts before and after the middle edge the same way,
+    which takes about log2(steps) times the work of A* for a fraction of its
+    memory: the open list of a grid is about its perimeter.
+
+    :param grid:      the maze.grid.Grid to search
+    :param start:     node id of the initial position of the robot
+    :param target:    node id of the target
+    :param max_nodes: the most nodes in the open list
+    :return:          a SearchResult
+    :raise NodeLimitExceeded: if the search needs more than max_nodes open nodes
+    """
+    prev = SparseTable(-1)  # only the route is recorded
+    if not grid.free[start] or not grid.free[target]:
+        return SearchResult(grid, start, target, prev, False, 0, INFINITY)
+    if start == target:
+        return SearchResult(grid, start, target, prev, True, 0, 0.0)
+    sr, sc = divmod(start, grid.columns)
+    tr, tc = divmod(target, grid.columns)
+    # the first middle edge is anywhere on the route, the cost is not known yet
+    middle = grid.min_cost * math.hypot(tr - sr, tc - sc) / 2
+    cost, edge, expanded = _frontier_search(grid, start, target, middle, max_nodes)
+    if edge is None:
+        return SearchResult(grid, start, target, prev, False, expanded, INFINITY)
+    # the parts of the route left to solve, as (start, end, cost, middle edge)
+    parts = [(start, target, cost, edge)]
+    while parts:
+        s, t, part_cost, (u, gu, v, gv) = parts.pop()
+        prev[v] = u
+        for a, b, middle in ((s, u, gu / 2), (v, t, (part_cost - gv) / 2)):
+            if a != b:
+                part_cost, edge, count = _frontier_search(grid, a, b, middle, max_nodes)
+                expanded += count
+                parts.append((a, b, part_cost, edge))
+    return SearchResult(grid, start, target, prev, True, expanded, cost)
+
+
+# the available algorithms, by the names used in Maze.selected_algo
+ALGORITHMS = {
+    "A*": astar,
+    "Dijkstra": dijkstra,
+    "Theta*": theta_star,
+    "Lazy Theta*": lazy_theta_star,
+    "Frontier A*": frontier_astar,
+}
+
+
+def solve(grid, start, target, algorithm="A*", **options):
+    """
+    Runs the selected algorithm from start to target
+
+    :param algorithm: one of the names in ALGORITHMS
+    :param options:   passed to the search, e.g. max_nodes for "Frontier A*"
+    """
+    try:
+        search = ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError("unknown algorithm: {0}".format(algorithm))
+    return search(grid, start, target, **options)
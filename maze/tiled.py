@@ -0,0 +1,224 @@
+"""
+Out-of-core grids: maps too large for the memory, searched from a file on disk.
+
+The cells are kept in a .npy file (one uint8 per cell, row-major) opened as a
+numpy memmap. TiledGrid reads it in square tiles of tile_size x tile_size cells
+on demand and keeps at most max_tiles of them in an LRU cache, so the memory
+used by the cells is bounded by max_tiles * tile_size ** 2 bytes whatever the
+size of the map. The solvers keep their tables in dicts (SparseTable) with an
+entry per node reached instead of flat arrays with an entry per node.
+
+TiledGrid has the interface of maze.grid.Grid the solvers rely on (free,
+successors, new_table, ...), without terrain costs.
+"""
+import math
+from collections import OrderedDict
+
+import numpy
+from numpy.lib.format import open_memmap
+
+from maze.grid import Grid, OBST, SQRT2
+
+TILE_SIZE = 256   # the side of a tile, in cells
+MAX_TILES = 64    # the number of tiles kept in memory (4 MB with the default size)
+
+
+class SparseTable(dict):
+    """
+    A table of the solvers that stores only the entries that have been set;
+    every other node has the default value
+    """
+
+    def __init__(self, default):
+        super(SparseTable, self).__init__()
+        self.default = default
+
+    def __missing__(self, node):
+        return self.default
+
+
+class FreeCells(object):
+    """
+    The passability table of a TiledGrid: free[node] is 1 if the node is not an obstacle
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __len__(self):
+        return len(self.grid)
+
+    def __getitem__(self, node):
+        grid = self.grid
+        ts = grid.tile_size
+        r, c = divmod(node, grid.columns)
+        return grid.tile((r // ts) * grid.tile_columns + c // ts)[(r % ts) * ts + c % ts]
+
+
+class TiledGrid(object):
+    """
+    A grid whose cells are paged in from an array on disk one tile at a time
+    """
+
+    def __init__(self, cells, tile_size=TILE_SIZE, max_tiles=MAX_TILES):
+        """
+        Constructor
+
+        :param cells:     2d array of cell values, usually a numpy memmap (see open_grid)
+        :param tile_size: the side of a tile, in cells
+        :param max_tiles: the number of tiles kept in memory
+        """
+        if tile_size < 3 or max_tiles < 1:
+            raise ValueError("tiles must be at least 3x3 and at least one must fit in memory")
+        self.cells = cells
+        self.rows, self.columns = cells.shape
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.tile_columns = math.ceil(self.columns / tile_size)
+        self.tiles = OrderedDict()  # tile id -> bytearray of the free flags of its cells
+        self.loads = 0              # the number of tiles read from the array
+        self.free = FreeCells(self)
+        # callbacks watcher(node, old value, new value) invoked by set()
+        self.watchers = []
+        self.costs = None
+        self.min_cost = 1.0
+
+    def __len__(self):
+        return self.rows * self.columns
+
+    def new_table(self, typecode, value):
+        """
+        Returns a sparse table with every entry set to value, see Grid.new_table()
+        """
+        return SparseTable(value)
+
+    def node(self, row, col):
+        return row * self.columns + col
+
+    def coords(self, node):
+        return divmod(node, self.columns)
+
+    def get(self, row, col):
+        return int(self.cells[row, col])
+
+    def set(self, row, col, value):
+        """
+        Changes the value of a cell in the array (which must be writable)
+        and in its tile if loaded, and notifies the watchers
+        """
+        node = row * self.columns + col
+        old = int(self.cells[row, col])
+        self.cells[row, col] = value
+        ts = self.tile_size
+        tile = self.tiles.get((row // ts) * self.tile_columns + col // ts)
+        if tile is not None:
+            tile[(row % ts) * ts + col % ts] = value != OBST
+        for watcher in self.watchers:
+            watcher(node, old, value)
+
+    def tile(self, tid):
+        """
+        Returns the free flags of the cells of a tile, row-major, reading the
+        tile from the array and evicting the least recently used one if needed.
+        Tiles at the right and bottom borders are padded with obstacles.
+        """
+        tiles = self.tiles
+        flags = tiles.get(tid)
+        if flags is not None:
+            tiles.move_to_end(tid)
+            return flags
+        ts = self.tile_size
+        tr, tc = divmod(tid, self.tile_columns)
+        block = numpy.asarray(self.cells[tr * ts:(tr + 1) * ts, tc * ts:(tc + 1) * ts])
+        padded = numpy.zeros((ts, ts), dtype=numpy.uint8)
+        padded[:block.shape[0], :block.shape[1]] = block != OBST
+        flags = bytearray(padded.tobytes())
+        if len(tiles) >= self.max_tiles:
+            tiles.popitem(last=False)
+        tiles[tid] = flags
+        self.loads += 1
+        return flags
+
+    def successors(self, u):
+        """
+        Returns the (node, step cost) pairs reachable from node u, as Grid.successors()
+        """
+        cols = self.columns
+        ts = self.tile_size
+        r, c = divmod(u, cols)
+        lr = r % ts
+        lc = c % ts
+        if not (0 < lr < ts - 1 and 0 < lc < ts - 1):
+            # the neighbours span several tiles
+            return Grid.successors(self, u)
+        # fast path: all the neighbours are in the tile of u, and the padding
+        # stands for the cells beyond the borders of the grid
+        free = self.tile((r // ts) * self.tile_columns + c // ts)
+        i = lr * ts + lc
+        up = free[i - ts]
+        down = free[i + ts]
+        left = free[i - 1]
+        right = free[i + 1]
+        temp = []
+        if up:
+            temp.append((u - cols, 1.0))
+        if free[i - ts + 1] and (up or right):
+            temp.append((u - cols + 1, SQRT2))
+        if right:
+            temp.append((u + 1, 1.0))
+        if free[i + ts + 1] and (down or right):
+            temp.append((u + cols + 1, SQRT2))
+        if down:
+            temp.append((u + cols, 1.0))
+        if free[i + ts - 1] and (down or left):
+            temp.append((u + cols - 1, SQRT2))
+        if left:
+            temp.append((u - 1, 1.0))
+        if free[i - ts - 1] and (up or left):
+            temp.append((u - cols - 1, SQRT2))
+        return temp
+
+    def cost_between(self, u, v):
+        return self.dist_between(u, v)
+
+    def dist_between(self, u, v):
+        ur, uc = divmod(u, self.columns)
+        vr, vc = divmod(v, self.columns)
+        return math.hypot(ur - vr, uc - vc)
+
+    def stats(self):
+        """
+        Returns the tile statistics: loads, tiles in memory and their bytes
+        """
+        ts = self.tile_size
+        return {"loads": self.loads, "tiles": len(self.tiles),
+                "bytes": len(self.tiles) * ts * ts, "limit": self.max_tiles * ts * ts}
+
+
+def open_grid(path, tile_size=TILE_SIZE, max_tiles=MAX_TILES, writable=False):
+    """
+    Opens a .npy grid file as a TiledGrid
+    """
+    cells = numpy.load(path, mmap_mode="r+" if writable else "r")
+    if cells.ndim != 2 or cells.dtype != numpy.uint8:
+        raise ValueError("{0} is not a 2d uint8 grid".format(path))
+    return TiledGrid(cells, tile_size, max_tiles)
+
+
+def save_grid(path, rows, height, width):
+    """
+    Writes grid rows to a .npy grid file as they come, e.g. from a maze generator
+
+    :param rows:   iterable of height 1d arrays of width cell values
+    :return:       the number of rows written
+    """
+    cells = open_memmap(path, mode="w+", dtype=numpy.uint8, shape=(height, width))
+    count = 0
+    for r, row in enumerate(rows):
+        cells[r] = row
+        count += 1
+    cells.flush()
+    del cells
+    if count != height:
+        raise ValueError("expected {0} rows but got {1}".format(height, count))
+    return count